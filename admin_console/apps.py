@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class AdminConsoleConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'admin_console'
+
+    def ready(self):
+        """Import signals when the app is ready."""
+        try:
+            import admin_console.signals  # noqa: F401
+        except ImportError:
+            pass
@@ -0,0 +1,27 @@
+"""
+Recompute the admin dashboard daily rollup rows.
+
+Usage:
+    python manage.py recompute_daily_stats            # yesterday only
+    python manage.py recompute_daily_stats --days 30  # backfill the chart window
+"""
+from django.core.management.base import BaseCommand
+
+from admin_console.tasks import recompute_daily_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the admin dashboard daily statistics'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=1,
+            help='Number of past days to recompute (default: 1, i.e. yesterday)',
+        )
+
+    def handle(self, *args, **options):
+        days = options['days']
+        recompute_daily_stats(days)
+        self.stdout.write(self.style.SUCCESS(f'Recomputed statistics for {days} day(s)'))
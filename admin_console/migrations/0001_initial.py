@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-15 22:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True, verbose_name='jour')),
+                ('new_users', models.IntegerField(default=0, verbose_name='nouveaux utilisateurs')),
+                ('logins_total', models.IntegerField(default=0, verbose_name='connexions')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='revenus')),
+                ('revenue_count', models.IntegerField(default=0, verbose_name='transactions complétées')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='modifié le')),
+            ],
+            options={
+                'verbose_name': 'statistiques journalières',
+                'verbose_name_plural': 'statistiques journalières',
+                'ordering': ['-day'],
+            },
+        ),
+    ]
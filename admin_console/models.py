@@ -1,3 +1,66 @@
+"""
+Admin Console - Models
+Rollup tables backing the admin dashboard charts.
+"""
+from datetime import date, timedelta
+
 from django.db import models
+from django.db.models import Sum, Count
+from django.utils.translation import gettext_lazy as _
+
+from utils.helpers import start_of_day
+
+
+class DashboardDailyStats(models.Model):
+    """
+    One row of pre-aggregated dashboard statistics per day.
+    Past days never change, so the charts read these rows instead of
+    re-aggregating the users and transactions tables on every page load.
+    """
+
+    day = models.DateField(_('jour'), unique=True)
+    new_users = models.IntegerField(_('nouveaux utilisateurs'), default=0)
+    logins_total = models.IntegerField(_('connexions'), default=0)
+    revenue = models.DecimalField(_('revenus'), max_digits=12, decimal_places=2, default=0)
+    revenue_count = models.IntegerField(_('transactions complétées'), default=0)
+    updated_at = models.DateTimeField(_('modifié le'), auto_now=True)
+
+    class Meta:
+        verbose_name = _('statistiques journalières')
+        verbose_name_plural = _('statistiques journalières')
+        ordering = ['-day']
+
+    def __str__(self):
+        return f"Statistiques du {self.day}"
+
+    @classmethod
+    def recompute(cls, day: date) -> 'DashboardDailyStats':
+        """Aggregate the statistics of a single day and upsert its row."""
+        from django.contrib.auth import get_user_model
+        from apps.accounts.models import LoginHistory
+        from apps.payments.models import PaymentTransaction
+
+        User = get_user_model()
+        day_start = start_of_day(day)
+        day_end = start_of_day(day + timedelta(days=1))
+
+        revenue = PaymentTransaction.objects.filter(
+            status=PaymentTransaction.TransactionStatus.COMPLETED,
+            completed_at__gte=day_start,
+            completed_at__lt=day_end,
+        ).aggregate(total=Sum('amount'), count=Count('id'))
 
-# Create your models here.
+        stats, _ = cls.objects.update_or_create(
+            day=day,
+            defaults={
+                'new_users': User.objects.filter(
+                    date_joined__gte=day_start, date_joined__lt=day_end
+                ).count(),
+                'logins_total': LoginHistory.objects.filter(
+                    login_at__gte=day_start, login_at__lt=day_end
+                ).count(),
+                'revenue': revenue['total'] or 0,
+                'revenue_count': revenue['count'],
+            }
+        )
+        return stats
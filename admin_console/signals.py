@@ -0,0 +1,58 @@
+"""
+Admin Console - Signals
+Invalidate the cached dashboard context when payments change, and keep
+the running total of detected losses in step with claim cases.
+"""
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from apps.audit_engine.models import ClaimCase
+from apps.payments.models import PaymentTransaction
+
+from .views import DASHBOARD_CACHE_KEY, TOTAL_LOSSES_CACHE_KEY
+
+
+@receiver(post_save, sender=PaymentTransaction)
+def invalidate_dashboard_cache(sender, instance, created, **kwargs):
+    """Drop the cached dashboard when a payment is created or completed."""
+    if created or instance.status == PaymentTransaction.TransactionStatus.COMPLETED:
+        cache.delete(DASHBOARD_CACHE_KEY)
+
+
+def _adjust_total_losses(delta):
+    """Shift the running total by `delta` euros; a cold counter is rebuilt on read."""
+    cents = int(delta * 100)
+    if not cents:
+        return
+    try:
+        cache.incr(TOTAL_LOSSES_CACHE_KEY, cents)
+    except ValueError:
+        pass
+
+
+@receiver(pre_save, sender=ClaimCase)
+def remember_previous_total_value(sender, instance, update_fields=None, **kwargs):
+    """Fetch the stored value of an existing case so post_save can apply the delta."""
+    instance._previous_total_value = 0
+    if instance._state.adding:
+        return
+    if update_fields is not None and 'total_value' not in update_fields:
+        instance._previous_total_value = instance.total_value
+        return
+    instance._previous_total_value = sender.objects.filter(
+        pk=instance.pk
+    ).values_list('total_value', flat=True).first() or 0
+
+
+@receiver(post_save, sender=ClaimCase)
+def add_claim_case_to_total_losses(sender, instance, **kwargs):
+    """Apply the change in value of a created or updated case."""
+    previous = getattr(instance, '_previous_total_value', 0)
+    _adjust_total_losses((instance.total_value or 0) - previous)
+
+
+@receiver(post_delete, sender=ClaimCase)
+def remove_claim_case_from_total_losses(sender, instance, **kwargs):
+    """Subtract a deleted case from the running total."""
+    _adjust_total_losses(-(instance.total_value or 0))
@@ -0,0 +1,25 @@
+"""
+Admin Console - Celery Tasks
+Periodic maintenance of the dashboard rollup tables.
+"""
+import logging
+from datetime import timedelta
+
+from celery import shared_task
+from django.utils import timezone
+
+from .models import DashboardDailyStats
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def recompute_daily_stats(days: int = 1):
+    """Recompute the dashboard rollup rows for the last `days` complete days."""
+    today = timezone.localdate()
+
+    for offset in range(1, days + 1):
+        DashboardDailyStats.recompute(today - timedelta(days=offset))
+
+    logger.info(f"Recomputed dashboard statistics for the last {days} day(s)")
+    return {'days': days}
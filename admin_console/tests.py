@@ -1,3 +1,161 @@
-from django.test import TestCase
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils import timezone
+from admin_console.models import DashboardDailyStats
+from admin_console.views import LIST_PAGE_SIZE, TOTAL_LOSSES_CACHE_TIMEOUT, get_total_losses
+from apps.accounts.models import SellerProfile
+from apps.audit_engine.models import Audit, ClaimCase
+from apps.payments.models import PaymentTransaction
+
+User = get_user_model()
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class AdminDashboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff = User.objects.create_user(
+            email='staff@example.com',
+            password='testpassword123',
+            is_staff=True
+        )
+        self.seller_profile = SellerProfile.objects.get_or_create(user=self.staff)[0]
+        self.client = Client()
+        self.client.login(email='staff@example.com', password='testpassword123')
+
+    def _create_transaction(self, status, amount):
+        return PaymentTransaction.objects.create(
+            seller_profile=self.seller_profile,
+            transaction_type=PaymentTransaction.TransactionType.CREDIT_PURCHASE,
+            status=status,
+            amount=Decimal(amount),
+        )
+
+    def test_dashboard_statistics(self):
+        """Test dashboard aggregates users and transactions correctly."""
+        User.objects.create_user(email='seller@example.com', password='testpassword123')
+        completed = self._create_transaction(PaymentTransaction.TransactionStatus.COMPLETED, '50.00')
+        completed.mark_completed()
+        self._create_transaction(PaymentTransaction.TransactionStatus.PENDING, '20.00')
+
+        response = self.client.get(reverse('admin_console:dashboard'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_users'], 2)
+        self.assertEqual(response.context['users_today'], 2)
+        self.assertEqual(response.context['total_revenue'], Decimal('50.00'))
+        self.assertEqual(response.context['revenue_today'], Decimal('50.00'))
+        self.assertEqual(response.context['pending_count'], 1)
+        self.assertEqual(response.context['pending_amount'], Decimal('20.00'))
+
+    def test_dashboard_requires_staff(self):
+        """Test non-staff users are redirected to the admin login."""
+        User.objects.create_user(email='seller@example.com', password='testpassword123')
+        self.client.login(email='seller@example.com', password='testpassword123')
+
+        response = self.client.get(reverse('admin_console:dashboard'))
+
+        self.assertEqual(response.status_code, 302)
+
+    def test_recompute_daily_stats(self):
+        """Test the rollup row aggregates the given day and feeds the charts."""
+        yesterday = timezone.localdate() - timedelta(days=1)
+        transaction = self._create_transaction(PaymentTransaction.TransactionStatus.COMPLETED, '30.00')
+        transaction.completed_at = timezone.now() - timedelta(days=1)
+        transaction.save(update_fields=['completed_at'])
+
+        stats = DashboardDailyStats.recompute(yesterday)
+        self.assertEqual(stats.revenue, Decimal('30.00'))
+        self.assertEqual(stats.revenue_count, 1)
+
+        # Recomputing the same day updates the row in place
+        DashboardDailyStats.recompute(yesterday)
+        self.assertEqual(DashboardDailyStats.objects.count(), 1)
+
+        response = self.client.get(reverse('admin_console:dashboard'))
+        self.assertEqual(response.context['revenue_chart'][0], (yesterday, Decimal('30.00')))
+        self.assertContains(response, 'id="revenue-chart-data"')
+
+    def test_dashboard_cache_invalidated_on_payment(self):
+        """Test the cached dashboard is refreshed when a payment completes."""
+        response = self.client.get(reverse('admin_console:dashboard'))
+        self.assertEqual(response.context['total_revenue'], 0)
+
+        transaction = self._create_transaction(PaymentTransaction.TransactionStatus.PENDING, '40.00')
+        response = self.client.get(reverse('admin_console:dashboard'))
+        self.assertEqual(response.context['pending_count'], 1)
+
+        transaction.mark_completed()
+        response = self.client.get(reverse('admin_console:dashboard'))
+        self.assertEqual(response.context['total_revenue'], Decimal('40.00'))
+        self.assertEqual(response.context['pending_count'], 0)
+
+    def test_list_pages_render(self):
+        """Test the users, transactions and logins lists render their rows."""
+        self._create_transaction(PaymentTransaction.TransactionStatus.PENDING, '15.00')
+
+        for name in ('users', 'transactions', 'logins'):
+            response = self.client.get(reverse(f'admin_console:{name}'))
+            self.assertEqual(response.status_code, 200)
+            self.assertContains(response, 'staff@example.com')
+
+    def test_transactions_list_paginated(self):
+        """Test the transactions list is split into pages and keeps the status filter."""
+        for _ in range(LIST_PAGE_SIZE + 5):
+            self._create_transaction(PaymentTransaction.TransactionStatus.PENDING, '10.00')
+
+        url = reverse('admin_console:transactions')
+        response = self.client.get(url, {'status': 'pending'})
+        self.assertEqual(len(response.context['page_obj']), LIST_PAGE_SIZE)
+        self.assertContains(response, '?status=pending&page=2')
+
+        response = self.client.get(url, {'status': 'pending', 'page': 2})
+        self.assertEqual(len(response.context['page_obj']), 5)
+
+    def test_total_losses_counter_follows_claim_cases(self):
+        """Test the running losses total tracks case creation, updates and deletion."""
+        today = timezone.localdate()
+        audit = Audit.objects.create(
+            seller_profile=self.seller_profile, start_date=today, end_date=today
+        )
+        self.assertEqual(get_total_losses(), 0)
+
+        case = ClaimCase.objects.create(
+            audit=audit, title='Perte', loss_type='lost_warehouse', sku='SKU-1',
+            total_quantity=2, total_value=Decimal('12.50'),
+            earliest_date=today, latest_date=today,
+        )
+        self.assertEqual(get_total_losses(), Decimal('12.50'))
+
+        case.total_value = Decimal('20.00')
+        case.save()
+        self.assertEqual(get_total_losses(), Decimal('20.00'))
+
+        case.delete()
+        self.assertEqual(get_total_losses(), 0)
+
+    def test_total_losses_counter_rebuilt_after_timeout(self):
+        """Test changes that bypass the signals are picked up once the counter expires."""
+        today = timezone.localdate()
+        audit = Audit.objects.create(
+            seller_profile=self.seller_profile, start_date=today, end_date=today
+        )
+        self.assertEqual(get_total_losses(), 0)
+
+        ClaimCase.objects.bulk_create([ClaimCase(
+            audit=audit, title='Perte', loss_type='lost_warehouse', sku='SKU-1',
+            total_quantity=1, total_value=Decimal('7.25'),
+            earliest_date=today, latest_date=today,
+        )])
+        self.assertEqual(get_total_losses(), 0)
+
+        expired = time.time() + TOTAL_LOSSES_CACHE_TIMEOUT + 1
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=expired):
+            self.assertEqual(get_total_losses(), Decimal('7.25'))
@@ -4,153 +4,212 @@ Comprehensive admin dashboard with statistics and monitoring.
 """
 from django.shortcuts import render
 from django.contrib.admin.views.decorators import staff_member_required
-from django.db.models import Sum, Count
-from django.db.models.functions import TruncDate, TruncMonth
+from django.db.models import Sum, Count, Q
 from django.utils import timezone
 from datetime import timedelta
+from decimal import Decimal
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.paginator import Paginator
+
+from utils.helpers import approx_count, start_of_day
+
+from .models import DashboardDailyStats
 
 User = get_user_model()
 
+# Dashboard statistics don't need to be second-fresh; bump the version
+# suffix whenever the shape of the cached context changes.
+DASHBOARD_CACHE_KEY = 'admin_console:dashboard:v2'
+DASHBOARD_CACHE_TIMEOUT = 60
+
+# Running sum of ClaimCase.total_value in cents, kept current by the
+# ClaimCase signals (see signals.py). Bulk writes and racing updates bypass
+# the signals, so the counter is rebuilt from the database every hour.
+TOTAL_LOSSES_CACHE_KEY = 'admin_console:total_losses_cents:v1'
+TOTAL_LOSSES_CACHE_TIMEOUT = 60 * 60
+
+# Columns rendered by the console tables; list querysets load only these
+TRANSACTION_LIST_FIELDS = (
+    'reference_code', 'amount', 'status', 'payment_method', 'created_at',
+    'seller_profile__user__email',
+)
+LOGIN_LIST_FIELDS = ('ip_address', 'login_at', 'user__email')
+USER_LIST_FIELDS = ('email', 'date_joined', 'is_staff', 'is_active')
+
+LIST_PAGE_SIZE = 50
+
+def _compute_total_losses_cents():
+    """Sum every claim case value, in cents."""
+    from apps.audit_engine.models import ClaimCase
+    
+    total = ClaimCase.objects.aggregate(total=Sum('total_value'))['total'] or 0
+    return int(total * 100)
+
+
+def get_total_losses():
+    """Total value of detected losses, read from the running counter."""
+    cents = cache.get_or_set(
+        TOTAL_LOSSES_CACHE_KEY,
+        _compute_total_losses_cents,
+        timeout=TOTAL_LOSSES_CACHE_TIMEOUT
+    )
+    return Decimal(cents) / 100
+
 
 @staff_member_required
 def admin_dashboard(request):
     """Main admin dashboard with all statistics."""
+    context = cache.get_or_set(
+        DASHBOARD_CACHE_KEY,
+        _compute_dashboard_context,
+        timeout=DASHBOARD_CACHE_TIMEOUT
+    )
     
-    today = timezone.now().date()
+    return render(request, 'admin_console/dashboard.html', context)
+
+
+def _compute_dashboard_context():
+    """Build the dashboard statistics context (cached by admin_dashboard)."""
+    today = timezone.localdate()
     week_ago = today - timedelta(days=7)
     month_ago = today - timedelta(days=30)
     
+    # Range bounds on the raw timestamps so their indexes can be used
+    today_start = start_of_day(today)
+    week_start = start_of_day(week_ago)
+    month_start = start_of_day(month_ago)
+    
     # Import models here to avoid circular imports
     from apps.accounts.models import SellerProfile, LoginHistory
     from apps.payments.models import PaymentTransaction
-    from apps.audit_engine.models import Audit, ClaimCase
+    from apps.audit_engine.models import Audit
     
     # =========================================================================
     # USER STATISTICS
     # =========================================================================
-    total_users = User.objects.count()
-    users_today = User.objects.filter(date_joined__date=today).count()
-    users_this_week = User.objects.filter(date_joined__date__gte=week_ago).count()
-    users_this_month = User.objects.filter(date_joined__date__gte=month_ago).count()
+    total_users = approx_count(User)
+    user_stats = User.objects.filter(date_joined__gte=month_start).aggregate(
+        today=Count('id', filter=Q(date_joined__gte=today_start)),
+        week=Count('id', filter=Q(date_joined__gte=week_start)),
+        month=Count('id'),
+    )
     
     # Users with Amazon connected
-    amazon_connected = SellerProfile.objects.filter(is_amazon_connected=True).count()
+    amazon_connected = SellerProfile.objects.filter(
+        amazon_seller_id__isnull=False
+    ).exclude(amazon_seller_id='').count()
     
     # =========================================================================
     # LOGIN STATISTICS
     # =========================================================================
-    recent_logins = LoginHistory.objects.select_related('user').order_by('-login_time')[:20]
-    logins_today = LoginHistory.objects.filter(login_time__date=today).count()
-    logins_this_week = LoginHistory.objects.filter(login_time__date__gte=week_ago).count()
+    recent_logins = list(LoginHistory.objects.select_related('user').only(
+        *LOGIN_LIST_FIELDS
+    ).order_by('-login_at')[:20])
+    login_stats = LoginHistory.objects.aggregate(
+        today=Count('id', filter=Q(login_at__gte=today_start)),
+        week=Count('id', filter=Q(login_at__gte=week_start)),
+    )
     
     # =========================================================================
     # REVENUE STATISTICS
     # =========================================================================
-    # Completed transactions
-    completed_transactions = PaymentTransaction.objects.filter(
-        status=PaymentTransaction.TransactionStatus.COMPLETED
+    completed = Q(status=PaymentTransaction.TransactionStatus.COMPLETED)
+    pending = Q(status=PaymentTransaction.TransactionStatus.PENDING)
+    
+    # Completed revenue buckets and pending totals in a single pass
+    payment_stats = PaymentTransaction.objects.aggregate(
+        revenue_total=Sum('amount', filter=completed),
+        revenue_today=Sum('amount', filter=completed & Q(completed_at__gte=today_start)),
+        revenue_week=Sum('amount', filter=completed & Q(completed_at__gte=week_start)),
+        revenue_month=Sum('amount', filter=completed & Q(completed_at__gte=month_start)),
+        pending_count=Count('id', filter=pending),
+        pending_amount=Sum('amount', filter=pending),
     )
     
-    total_revenue = completed_transactions.aggregate(total=Sum('amount'))['total'] or 0
-    revenue_today = completed_transactions.filter(
-        completed_at__date=today
-    ).aggregate(total=Sum('amount'))['total'] or 0
-    revenue_this_week = completed_transactions.filter(
-        completed_at__date__gte=week_ago
-    ).aggregate(total=Sum('amount'))['total'] or 0
-    revenue_this_month = completed_transactions.filter(
-        completed_at__date__gte=month_ago
-    ).aggregate(total=Sum('amount'))['total'] or 0
-    
     # Pending transactions (awaiting bank transfer validation)
-    pending_transactions = PaymentTransaction.objects.filter(
-        status=PaymentTransaction.TransactionStatus.PENDING
-    ).select_related('seller_profile__user').order_by('-created_at')[:10]
-    
-    pending_count = PaymentTransaction.objects.filter(
-        status=PaymentTransaction.TransactionStatus.PENDING
-    ).count()
-    
-    pending_amount = PaymentTransaction.objects.filter(
-        status=PaymentTransaction.TransactionStatus.PENDING
-    ).aggregate(total=Sum('amount'))['total'] or 0
+    pending_transactions = list(PaymentTransaction.objects.filter(
+        pending
+    ).select_related('seller_profile__user').only(
+        *TRANSACTION_LIST_FIELDS
+    ).order_by('-created_at')[:10])
     
     # All recent transactions
-    recent_transactions = PaymentTransaction.objects.select_related(
+    recent_transactions = list(PaymentTransaction.objects.select_related(
         'seller_profile__user'
-    ).order_by('-created_at')[:15]
+    ).only(*TRANSACTION_LIST_FIELDS).order_by('-created_at')[:15])
     
     # =========================================================================
     # AUDIT STATISTICS
     # =========================================================================
-    total_audits = Audit.objects.count()
-    audits_in_progress = Audit.objects.filter(status='in_progress').count()
-    audits_completed = Audit.objects.filter(status='completed').count()
+    total_audits = approx_count(Audit)
+    audit_stats = Audit.objects.filter(status__in=['in_progress', 'completed']).aggregate(
+        in_progress=Count('id', filter=Q(status='in_progress')),
+        completed=Count('id', filter=Q(status='completed')),
+    )
     
     # Total losses detected
-    total_losses = ClaimCase.objects.aggregate(total=Sum('total_value'))['total'] or 0
+    total_losses = get_total_losses()
     
     # =========================================================================
     # CHARTS DATA (Last 30 days)
     # =========================================================================
-    # Registrations per day
-    registrations_chart = User.objects.filter(
-        date_joined__date__gte=month_ago
-    ).annotate(
-        day=TruncDate('date_joined')
-    ).values('day').annotate(count=Count('id')).order_by('day')
-    
-    # Revenue per day
-    revenue_chart = completed_transactions.filter(
-        completed_at__date__gte=month_ago
-    ).annotate(
-        day=TruncDate('completed_at')
-    ).values('day').annotate(total=Sum('amount')).order_by('day')
+    # Past days come from the nightly rollup (see DashboardDailyStats);
+    # today's point reuses the live aggregates computed above.
+    daily_stats = list(DashboardDailyStats.objects.filter(
+        day__gte=month_ago, day__lt=today
+    ).order_by('day').values_list('day', 'new_users', 'revenue'))
+    
+    # (day, value) pairs, serialized for the charts with json_script
+    registrations_chart = [(day, new_users) for day, new_users, _ in daily_stats]
+    registrations_chart.append((today, user_stats['today']))
+    
+    revenue_chart = [(day, revenue) for day, _, revenue in daily_stats]
+    revenue_chart.append((today, payment_stats['revenue_today'] or 0))
     
     # =========================================================================
     # RECENT USERS
     # =========================================================================
-    recent_users = User.objects.order_by('-date_joined')[:10]
+    recent_users = list(User.objects.only(*USER_LIST_FIELDS).order_by('-date_joined')[:10])
     
     context = {
         # User stats
         'total_users': total_users,
-        'users_today': users_today,
-        'users_this_week': users_this_week,
-        'users_this_month': users_this_month,
+        'users_today': user_stats['today'],
+        'users_this_week': user_stats['week'],
+        'users_this_month': user_stats['month'],
         'amazon_connected': amazon_connected,
         
         # Login stats
         'recent_logins': recent_logins,
-        'logins_today': logins_today,
-        'logins_this_week': logins_this_week,
+        'logins_today': login_stats['today'],
+        'logins_this_week': login_stats['week'],
         
         # Revenue stats
-        'total_revenue': total_revenue,
-        'revenue_today': revenue_today,
-        'revenue_this_week': revenue_this_week,
-        'revenue_this_month': revenue_this_month,
+        'total_revenue': payment_stats['revenue_total'] or 0,
+        'revenue_today': payment_stats['revenue_today'] or 0,
+        'revenue_this_week': payment_stats['revenue_week'] or 0,
+        'revenue_this_month': payment_stats['revenue_month'] or 0,
         'pending_transactions': pending_transactions,
-        'pending_count': pending_count,
-        'pending_amount': pending_amount,
+        'pending_count': payment_stats['pending_count'],
+        'pending_amount': payment_stats['pending_amount'] or 0,
         'recent_transactions': recent_transactions,
         
         # Audit stats
         'total_audits': total_audits,
-        'audits_in_progress': audits_in_progress,
-        'audits_completed': audits_completed,
+        'audits_in_progress': audit_stats['in_progress'],
+        'audits_completed': audit_stats['completed'],
         'total_losses': total_losses,
         
         # Charts
-        'registrations_chart': list(registrations_chart),
-        'revenue_chart': list(revenue_chart),
+        'registrations_chart': registrations_chart,
+        'revenue_chart': revenue_chart,
         
         # Recent users
         'recent_users': recent_users,
     }
     
-    return render(request, 'admin_console/dashboard.html', context)
+    return context
 
 
 @staff_member_required
@@ -158,10 +217,11 @@ def users_list(request):
     """List all users with details."""
     from apps.accounts.models import SellerProfile
     
-    users = User.objects.all().order_by('-date_joined')
+    users = User.objects.only(*USER_LIST_FIELDS).order_by('-date_joined')
+    page_obj = Paginator(users, LIST_PAGE_SIZE).get_page(request.GET.get('page'))
     
     context = {
-        'users': users,
+        'page_obj': page_obj,
     }
     return render(request, 'admin_console/users_list.html', context)
 
@@ -175,13 +235,15 @@ def transactions_list(request):
     
     transactions = PaymentTransaction.objects.select_related(
         'seller_profile__user'
-    ).order_by('-created_at')
+    ).only(*TRANSACTION_LIST_FIELDS).order_by('-created_at')
     
     if status_filter:
         transactions = transactions.filter(status=status_filter)
     
+    page_obj = Paginator(transactions, LIST_PAGE_SIZE).get_page(request.GET.get('page'))
+    
     context = {
-        'transactions': transactions,
+        'page_obj': page_obj,
         'status_filter': status_filter,
     }
     return render(request, 'admin_console/transactions_list.html', context)
@@ -192,7 +254,9 @@ def logins_list(request):
     """List all login history."""
     from apps.accounts.models import LoginHistory
     
-    logins = LoginHistory.objects.select_related('user').order_by('-login_time')[:100]
+    logins = LoginHistory.objects.select_related('user').only(
+        *LOGIN_LIST_FIELDS, 'user_agent'
+    ).order_by('-login_at')[:100]
     
     context = {
         'logins': logins,
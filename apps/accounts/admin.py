@@ -6,9 +6,12 @@ Django admin configuration for user management.
 
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.db.models import Case, CharField, Value, When
+from django.db.models.functions import Coalesce, Concat, NullIf, Trim
 from django.utils.translation import gettext_lazy as _
 from django.utils.html import format_html
 
+from .forms import CustomUserChangeForm
 from .models import User, SellerProfile, CreditTransaction, LoginHistory, APIKey
 
 
@@ -61,6 +64,7 @@ class SellerProfileInline(admin.StackedInline):
 class UserAdmin(BaseUserAdmin):
     """Custom User admin."""
     
+    form = CustomUserChangeForm
     list_display = (
         'email',
         'display_name',
@@ -79,6 +83,7 @@ class UserAdmin(BaseUserAdmin):
     )
     search_fields = ('email', 'first_name', 'last_name', 'company_name')
     ordering = ('-date_joined',)
+    list_select_related = ('seller_profile',)
     
     fieldsets = (
         (None, {'fields': ('email', 'password')}),
@@ -108,12 +113,33 @@ class UserAdmin(BaseUserAdmin):
     inlines = [SellerProfileInline]
     readonly_fields = ('date_joined', 'last_login')
     
+    def get_queryset(self, request):
+        # Resolve display name and tier label in SQL rather than per row.
+        # Same fallbacks as User.display_name: company name, then full name,
+        # then email (get_full_name returns the email when both names are blank).
+        return super().get_queryset(request).annotate(
+            _display_name=Coalesce(
+                NullIf('company_name', Value('')),
+                NullIf(Trim(Concat('first_name', Value(' '), 'last_name')), Value('')),
+                'email',
+                output_field=CharField(),
+            ),
+            _subscription_tier_display=Case(
+                *[
+                    When(seller_profile__subscription_tier=tier, then=Value(str(label)))
+                    for tier, label in SellerProfile.SubscriptionTier.choices
+                ],
+                output_field=CharField(),
+            ),
+        )
+    
     def display_name(self, obj):
-        return obj.display_name
+        return getattr(obj, '_display_name', None) or obj.display_name
     display_name.short_description = 'Nom affiché'
     
     def get_amazon_status(self, obj):
-        if hasattr(obj, 'seller_profile') and obj.seller_profile.is_amazon_connected:
+        profile = getattr(obj, 'seller_profile', None)
+        if profile is not None and profile.is_amazon_connected:
             return format_html(
                 '<span style="color: green;">✓ Connecté</span>'
             )
@@ -123,8 +149,9 @@ class UserAdmin(BaseUserAdmin):
     get_amazon_status.short_description = 'Amazon'
     
     def get_subscription(self, obj):
-        if hasattr(obj, 'seller_profile'):
-            tier = obj.seller_profile.subscription_tier
+        profile = getattr(obj, 'seller_profile', None)
+        if profile is not None:
+            tier = profile.subscription_tier
             colors = {
                 'free': 'gray',
                 'starter': 'blue',
@@ -135,7 +162,8 @@ class UserAdmin(BaseUserAdmin):
             return format_html(
                 '<span style="color: {};">{}</span>',
                 color,
-                obj.seller_profile.get_subscription_tier_display()
+                getattr(obj, '_subscription_tier_display', None)
+                or profile.get_subscription_tier_display()
             )
         return '-'
     get_subscription.short_description = 'Abonnement'
@@ -163,6 +191,7 @@ class SellerProfileAdmin(admin.ModelAdmin):
         'user__company_name',
         'amazon_seller_id',
     )
+    list_select_related = ('user',)
     readonly_fields = (
         'total_audits_run',
         'total_claims_generated',
@@ -171,8 +200,16 @@ class SellerProfileAdmin(admin.ModelAdmin):
         'updated_at',
     )
     
+    def get_queryset(self, request):
+        # Compute the connection status in SQL rather than per row
+        return super().get_queryset(request).with_status_flags()
+    
     def is_amazon_connected_display(self, obj):
-        if obj.is_amazon_connected:
+        connected = (
+            obj.amazon_connected_flag if hasattr(obj, 'amazon_connected_flag')
+            else obj.is_amazon_connected
+        )
+        if connected:
             return format_html('<span style="color: green;">✓</span>')
         return format_html('<span style="color: red;">✗</span>')
     is_amazon_connected_display.short_description = 'Amazon Connecté'
@@ -190,8 +227,11 @@ class CreditTransactionAdmin(admin.ModelAdmin):
         'created_at',
     )
     list_filter = ('transaction_type', 'created_at')
-    search_fields = ('seller_profile__user__email', 'description', 'reference')
-    readonly_fields = ('created_at',)
+    # user_email is the address at the time of the transaction; the current
+    # address is searched too so a user's full history is found after a change
+    search_fields = ('user_email', 'seller_profile__user__email', 'description', 'reference')
+    list_select_related = ('seller_profile__user',)
+    readonly_fields = ('user_email', 'created_at')
     date_hierarchy = 'created_at'
 
 
@@ -207,6 +247,7 @@ class LoginHistoryAdmin(admin.ModelAdmin):
     )
     list_filter = ('login_successful', 'login_at')
     search_fields = ('user__email', 'ip_address')
+    list_select_related = ('user',)
     readonly_fields = ('user', 'ip_address', 'user_agent', 'login_successful', 'login_at')
     date_hierarchy = 'login_at'
     
@@ -232,4 +273,5 @@ class APIKeyAdmin(admin.ModelAdmin):
     )
     list_filter = ('is_active', 'created_at')
     search_fields = ('name', 'user__email', 'key_prefix')
+    list_select_related = ('user',)
     readonly_fields = ('key_prefix', 'key_hash', 'created_at', 'last_used_at')
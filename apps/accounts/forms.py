@@ -6,6 +6,7 @@ Forms for user registration, profile updates, etc.
 
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, UserChangeForm
+from django.db.models.functions import Lower
 from django.utils.translation import gettext_lazy as _
 
 from .models import User, SellerProfile
@@ -100,7 +101,22 @@ class CustomUserChangeForm(UserChangeForm):
     
     class Meta:
         model = User
-        fields = '__all__'
+        # Editable fields of UserAdmin.fieldsets
+        fields = (
+            'email',
+            'password',
+            'first_name',
+            'last_name',
+            'phone',
+            'company_name',
+            'email_notifications',
+            'preferred_language',
+            'is_active',
+            'is_staff',
+            'is_superuser',
+            'groups',
+            'user_permissions',
+        )
 
 
 class UserProfileForm(forms.ModelForm):
@@ -178,14 +194,22 @@ class ChangeEmailForm(forms.Form):
         confirm_email = cleaned_data.get('confirm_email', '').lower()
         current_password = cleaned_data.get('current_password')
         
-        # Check emails match
+        # Field errors are already reported; skip the lookups and hashing
+        if not new_email or not current_password:
+            return cleaned_data
+        
+        # Cheap checks first: password hashing is the expensive step
         if new_email != confirm_email:
             raise forms.ValidationError(
                 _('Les adresses email ne correspondent pas.')
             )
         
         # Check email not already in use
-        if User.objects.filter(email=new_email).exclude(pk=self.user.pk).exists():
+        # LOWER(email) matches the user_email_ci_uniq functional index
+        in_use = User.objects.alias(email_lower=Lower('email')).filter(
+            email_lower=new_email
+        ).exclude(pk=self.user.pk).exists()
+        if in_use:
             raise forms.ValidationError(
                 _('Cette adresse email est déjà utilisée.')
             )
@@ -235,7 +259,12 @@ class DeleteAccountForm(forms.Form):
         confirm_email = cleaned_data.get('confirm_email', '').lower()
         password = cleaned_data.get('password')
         
-        if confirm_email != self.user.email:
+        # Field errors are already reported; skip the hashing
+        if not confirm_email or not password:
+            return cleaned_data
+        
+        # Cheap check first: password hashing is the expensive step
+        if confirm_email != self.user.email.lower():
             raise forms.ValidationError(
                 _('L\'adresse email ne correspond pas à votre compte.')
             )
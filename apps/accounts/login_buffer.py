@@ -0,0 +1,105 @@
+"""
+Accounts Login Buffer
+=====================
+Buffer LoginHistory rows in Redis and write them in batches.
+
+Login signals push one JSON entry per attempt onto a Redis list; the
+`flush_login_history` task drains it with bulk_create. Without a Redis
+cache (development, local-memory fallback) or when Redis is unreachable,
+entries are written straight to the database as before.
+"""
+
+import json
+import logging
+
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.accounts.models import User, LoginHistory
+
+logger = logging.getLogger(__name__)
+
+LOGIN_HISTORY_BUFFER_KEY = 'accounts:login_history_buffer'
+FLUSH_BATCH_SIZE = 500
+
+
+def _get_redis_client():
+    """Return the raw redis client behind the default cache, if it is Redis."""
+    # django.core.cache.cache is a proxy; check the backend behind it
+    backend = caches['default']
+    if not isinstance(backend, RedisCache):
+        return None
+    return backend._cache.get_client(LOGIN_HISTORY_BUFFER_KEY, write=True)
+
+
+def record_login(user_id: int, ip_address: str, user_agent: str, login_successful: bool):
+    """Buffer a login attempt, or write it immediately when Redis is unavailable."""
+    fields = {
+        'user_id': user_id,
+        'ip_address': ip_address,
+        'user_agent': user_agent,
+        'login_successful': login_successful,
+        'login_at': timezone.now(),
+    }
+
+    client = _get_redis_client()
+    if client is not None:
+        try:
+            client.rpush(
+                LOGIN_HISTORY_BUFFER_KEY,
+                json.dumps({**fields, 'login_at': fields['login_at'].isoformat()})
+            )
+            return
+        except Exception as e:
+            logger.warning(f"Login buffer unavailable ({e}). Writing login history directly.")
+
+    LoginHistory.objects.create(**fields)
+
+
+def flush_buffered_logins() -> int:
+    """Move buffered login attempts into LoginHistory. Returns the rows written."""
+    client = _get_redis_client()
+    if client is None:
+        return 0
+
+    written = 0
+    while True:
+        pipe = client.pipeline()
+        pipe.lrange(LOGIN_HISTORY_BUFFER_KEY, 0, FLUSH_BATCH_SIZE - 1)
+        pipe.ltrim(LOGIN_HISTORY_BUFFER_KEY, FLUSH_BATCH_SIZE, -1)
+        raw_entries, _ = pipe.execute()
+        if not raw_entries:
+            break
+
+        entries = [json.loads(raw) for raw in raw_entries]
+
+        # Users deleted since their login was buffered are dropped
+        existing_ids = set(User.objects.filter(
+            pk__in={entry['user_id'] for entry in entries}
+        ).values_list('pk', flat=True))
+
+        rows = [
+            LoginHistory(
+                user_id=entry['user_id'],
+                ip_address=entry['ip_address'],
+                user_agent=entry['user_agent'],
+                login_successful=entry['login_successful'],
+                login_at=parse_datetime(entry['login_at']),
+            )
+            for entry in entries
+            if entry['user_id'] in existing_ids
+        ]
+        try:
+            LoginHistory.objects.bulk_create(rows, batch_size=FLUSH_BATCH_SIZE)
+        except Exception:
+            # Put the batch back at the head of the list for the next flush
+            client.lpush(LOGIN_HISTORY_BUFFER_KEY, *reversed(raw_entries))
+            raise
+        written += len(rows)
+
+        if len(raw_entries) < FLUSH_BATCH_SIZE:
+            break
+
+    return written
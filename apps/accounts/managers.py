@@ -6,6 +6,7 @@ Custom model managers for accounts app.
 
 from django.contrib.auth.models import BaseUserManager
 from django.db import models
+from django.db.models.functions import Now
 from django.utils import timezone
 
 
@@ -68,3 +69,38 @@ class SubscribedManager(models.Manager):
             subscription_ends_at__lte=expiry_threshold,
             subscription_ends_at__gt=timezone.now()
         )
+
+
+
+class SellerProfileQuerySet(models.QuerySet):
+    """
+    QuerySet for seller profiles.
+    """
+    
+    def with_status_flags(self):
+        """
+        Annotate the is_amazon_connected / has_active_subscription checks
+        so serializing a list does not evaluate the properties per row.
+        """
+        connected = (
+            models.Q(amazon_seller_id__isnull=False) & ~models.Q(amazon_seller_id='') & (
+                models.Q(amazon_token_expires_at__isnull=True) |
+                models.Q(amazon_token_expires_at__gt=Now())
+            )
+        )
+        subscribed = ~models.Q(subscription_tier='free') & (
+            models.Q(subscription_ends_at__isnull=True) |
+            models.Q(subscription_ends_at__gt=Now())
+        )
+        return self.annotate(
+            amazon_connected_flag=models.Case(
+                models.When(connected, then=models.Value(True)),
+                default=models.Value(False),
+                output_field=models.BooleanField(),
+            ),
+            active_subscription_flag=models.Case(
+                models.When(subscribed, then=models.Value(True)),
+                default=models.Value(False),
+                output_field=models.BooleanField(),
+            ),
+        )
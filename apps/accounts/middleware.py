@@ -0,0 +1,37 @@
+"""
+Accounts Middleware
+===================
+Request-level helpers for the accounts app.
+"""
+
+from django.utils.functional import SimpleLazyObject
+
+from .models import SellerProfile
+
+
+def get_seller_profile(request):
+    """Load (or create) the seller profile of the authenticated user."""
+    user = request.user
+    if not user.is_authenticated:
+        return None
+    
+    seller_profile, _ = SellerProfile.objects.get_or_create(user=user)
+    
+    # Share the instance with user.seller_profile so both are the same object
+    seller_profile.user = user
+    user.seller_profile = seller_profile
+    return seller_profile
+
+
+class SellerProfileMiddleware:
+    """
+    Expose `request.seller_profile`, loaded lazily on first access and
+    at most once per request. Must come after AuthenticationMiddleware.
+    """
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+    
+    def __call__(self, request):
+        request.seller_profile = SimpleLazyObject(lambda: get_seller_profile(request))
+        return self.get_response(request)
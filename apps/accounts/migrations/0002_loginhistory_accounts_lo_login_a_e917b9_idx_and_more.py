@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-15 23:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='loginhistory',
+            index=models.Index(fields=['login_at'], name='accounts_lo_login_a_e917b9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['date_joined'], name='accounts_us_date_jo_ff39bb_idx'),
+        ),
+    ]
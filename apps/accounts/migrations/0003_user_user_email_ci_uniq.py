@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-15 23:04
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_loginhistory_accounts_lo_login_a_e917b9_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='user',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('email'), name='user_email_ci_uniq'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-15 23:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_user_user_email_ci_uniq'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sellerprofile',
+            index=models.Index(condition=models.Q(('amazon_seller_id__isnull', False), models.Q(('amazon_seller_id', ''), _negated=True)), fields=['amazon_token_expires_at'], name='seller_amazon_connected_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sellerprofile',
+            index=models.Index(condition=models.Q(('subscription_tier', 'free'), _negated=True), fields=['subscription_ends_at'], name='seller_subscribed_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-15 23:10
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_sellerprofile_seller_amazon_connected_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='loginhistory',
+            name='login_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='date de connexion'),
+        ),
+    ]
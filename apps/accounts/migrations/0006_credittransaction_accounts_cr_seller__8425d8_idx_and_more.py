@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-15 23:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_alter_loginhistory_login_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='credittransaction',
+            index=models.Index(fields=['seller_profile', '-created_at'], name='accounts_cr_seller__8425d8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loginhistory',
+            index=models.Index(fields=['user', '-login_at'], name='accounts_lo_user_id_5b72ce_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sellerprofile',
+            index=models.Index(fields=['stripe_customer_id'], name='accounts_se_stripe__d7347d_idx'),
+        ),
+    ]
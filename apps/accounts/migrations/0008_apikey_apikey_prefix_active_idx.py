@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-15 23:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_credittransaction_accounts_cr_seller__8425d8_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='apikey',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['key_prefix'], name='apikey_prefix_active_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Marketplace containment lookups on PostgreSQL
+
+from django.db import migrations
+
+INDEX_NAME = 'seller_marketplace_ids_gin'
+
+
+def create_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {INDEX_NAME} ON accounts_sellerprofile '
+        'USING gin (amazon_marketplace_ids jsonb_path_ops)'
+    )
+
+
+def drop_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_apikey_apikey_prefix_active_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_gin_index, drop_gin_index),
+    ]
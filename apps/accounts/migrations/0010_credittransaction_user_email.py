@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-15 23:16
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_user_email(apps, schema_editor):
+    CreditTransaction = apps.get_model('accounts', 'CreditTransaction')
+    SellerProfile = apps.get_model('accounts', 'SellerProfile')
+    CreditTransaction.objects.filter(user_email='').update(
+        user_email=Subquery(
+            SellerProfile.objects.filter(
+                pk=OuterRef('seller_profile_id')
+            ).values('user__email')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_sellerprofile_marketplace_ids_gin'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='credittransaction',
+            name='user_email',
+            field=models.EmailField(blank=True, db_index=True, editable=False, max_length=254, verbose_name='email utilisateur'),
+        ),
+        migrations.RunPython(backfill_user_email, migrations.RunPython.noop),
+    ]
@@ -4,12 +4,19 @@ Accounts Models
 Custom user model and seller profile for Amazon sellers.
 """
 
+import hmac
+from collections import defaultdict
+
 from django.contrib.auth.models import AbstractUser, BaseUserManager
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Lower
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
-from utils.helpers import generate_secure_token
+from utils.helpers import generate_secure_token, hash_sensitive_data
+
+from .managers import SellerProfileQuerySet
 
 
 class UserManager(BaseUserManager):
@@ -99,6 +106,13 @@ class User(AbstractUser):
         verbose_name = _('utilisateur')
         verbose_name_plural = _('utilisateurs')
         ordering = ['-date_joined']
+        indexes = [
+            models.Index(fields=['date_joined']),
+        ]
+        constraints = [
+            # Backs case-insensitive email lookups on LOWER(email)
+            models.UniqueConstraint(Lower('email'), name='user_email_ci_uniq'),
+        ]
     
     def __str__(self):
         return self.email
@@ -147,6 +161,7 @@ class SellerProfile(models.Model):
         null=True,
         unique=True
     )
+    # GIN-indexed on PostgreSQL (migration 0009) for __contains=[marketplace_id]
     amazon_marketplace_ids = models.JSONField(
         _('marketplaces Amazon'),
         default=list,
@@ -215,9 +230,25 @@ class SellerProfile(models.Model):
     created_at = models.DateTimeField(_('créé le'), auto_now_add=True)
     updated_at = models.DateTimeField(_('modifié le'), auto_now=True)
     
+    objects = SellerProfileQuerySet.as_manager()
+    
     class Meta:
         verbose_name = _('profil vendeur')
         verbose_name_plural = _('profils vendeurs')
+        indexes = [
+            # Match the AmazonConnectedManager / SubscribedManager predicates
+            models.Index(
+                fields=['amazon_token_expires_at'],
+                condition=models.Q(amazon_seller_id__isnull=False) & ~models.Q(amazon_seller_id=''),
+                name='seller_amazon_connected_idx',
+            ),
+            models.Index(
+                fields=['subscription_ends_at'],
+                condition=~models.Q(subscription_tier='free'),
+                name='seller_subscribed_idx',
+            ),
+            models.Index(fields=['stripe_customer_id']),
+        ]
     
     def __str__(self):
         return f"Profil de {self.user.email}"
@@ -254,41 +285,69 @@ class SellerProfile(models.Model):
         return self.subscription_ends_at <= expiry_threshold
     
     def add_credits(self, amount: int, description: str = ''):
-        """Add credits to the user's balance."""
-        self.credits_balance += amount
-        self.save(update_fields=['credits_balance', 'updated_at'])
+        """
+        Add credits to the user's balance.
+        Written with QuerySet.update(): SellerProfile save signals do not fire.
+        """
+        with transaction.atomic():
+            # Single UPDATE: concurrent purchases cannot overwrite each other
+            type(self).objects.filter(pk=self.pk).update(
+                credits_balance=F('credits_balance') + amount,
+                updated_at=timezone.now(),
+            )
+            
+            # Log the transaction
+            CreditTransaction.objects.create(
+                seller_profile=self,
+                amount=amount,
+                transaction_type=CreditTransaction.TransactionType.CREDIT,
+                description=description
+            )
         
-        # Log the transaction
-        CreditTransaction.objects.create(
-            seller_profile=self,
-            amount=amount,
-            transaction_type=CreditTransaction.TransactionType.CREDIT,
-            description=description
-        )
+        self.refresh_from_db(fields=['credits_balance', 'updated_at'])
     
     def deduct_credits(self, amount: int, description: str = '') -> bool:
         """
         Deduct credits from the user's balance.
         Returns True if successful, False if insufficient balance.
+        Written with QuerySet.update(): SellerProfile save signals do not fire.
         """
-        if self.credits_balance < amount:
-            return False
-        
-        self.credits_balance -= amount
-        self.save(update_fields=['credits_balance', 'updated_at'])
-        
-        # Log the transaction
-        CreditTransaction.objects.create(
-            seller_profile=self,
-            amount=-amount,
-            transaction_type=CreditTransaction.TransactionType.DEBIT,
-            description=description
-        )
+        with transaction.atomic():
+            # The balance check and the decrement happen in the same UPDATE
+            updated = type(self).objects.filter(
+                pk=self.pk, credits_balance__gte=amount
+            ).update(
+                credits_balance=F('credits_balance') - amount,
+                updated_at=timezone.now(),
+            )
+            if not updated:
+                return False
+            
+            # Log the transaction
+            CreditTransaction.objects.create(
+                seller_profile=self,
+                amount=-amount,
+                transaction_type=CreditTransaction.TransactionType.DEBIT,
+                description=description
+            )
         
+        self.refresh_from_db(fields=['credits_balance', 'updated_at'])
         return True
     
-    def disconnect_amazon(self):
-        """Disconnect the Amazon account."""
+    def disconnect_amazon(self) -> bool:
+        """
+        Disconnect the Amazon account (saved normally, so save signals fire).
+        Returns False without writing when the profile is already disconnected.
+        """
+        already_disconnected = (
+            self.amazon_seller_id is None
+            and not self.amazon_marketplace_ids
+            and self.amazon_connected_at is None
+            and self.amazon_token_expires_at is None
+        )
+        if already_disconnected:
+            return False
+        
         self.amazon_seller_id = None
         self.amazon_marketplace_ids = []
         self.amazon_connected_at = None
@@ -300,6 +359,7 @@ class SellerProfile(models.Model):
             'amazon_token_expires_at',
             'updated_at'
         ])
+        return True
 
 
 class CreditTransaction(models.Model):
@@ -327,15 +387,59 @@ class CreditTransaction(models.Model):
     )
     description = models.TextField(_('description'), blank=True)
     reference = models.CharField(_('référence'), max_length=100, blank=True)
+    # Copied from the seller's user at insert time so listings need no joins
+    user_email = models.EmailField(_('email utilisateur'), blank=True, editable=False, db_index=True)
     created_at = models.DateTimeField(_('créé le'), auto_now_add=True)
     
     class Meta:
         verbose_name = _('transaction de crédits')
         verbose_name_plural = _('transactions de crédits')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['seller_profile', '-created_at']),
+        ]
     
     def __str__(self):
-        return f"{self.get_transaction_type_display()} {self.amount} - {self.seller_profile.user.email}"
+        return f"{self.get_transaction_type_display()} {self.amount} - {self.user_email}"
+    
+    def save(self, *args, **kwargs):
+        if not self.user_email:
+            self.user_email = self.seller_profile.user.email
+        super().save(*args, **kwargs)
+    
+    @classmethod
+    def bulk_apply(cls, entries):
+        """
+        Record many unsaved transactions and apply them to the balances
+        with one INSERT batch and one grouped UPDATE (e.g. promotional
+        top-ups). Amounts are applied as-is without a balance check, so
+        use SellerProfile.deduct_credits for debits that must not overdraw.
+        Neither model's save signals fire for these rows.
+        """
+        entries = list(entries)
+        if not entries:
+            return []
+        
+        deltas = defaultdict(int)
+        for entry in entries:
+            deltas[entry.seller_profile_id] += entry.amount
+        
+        # bulk_create skips save(), so fill the denormalized email here
+        emails = dict(SellerProfile.objects.filter(pk__in=deltas).values_list('pk', 'user__email'))
+        for entry in entries:
+            if not entry.user_email:
+                entry.user_email = emails.get(entry.seller_profile_id, '')
+        
+        with transaction.atomic():
+            created = cls.objects.bulk_create(entries, batch_size=1000)
+            SellerProfile.objects.filter(pk__in=deltas).update(
+                credits_balance=F('credits_balance') + Case(
+                    *[When(pk=pk, then=Value(delta)) for pk, delta in deltas.items()],
+                    default=Value(0),
+                ),
+                updated_at=timezone.now(),
+            )
+        return created
 
 
 class LoginHistory(models.Model):
@@ -352,12 +456,17 @@ class LoginHistory(models.Model):
     ip_address = models.GenericIPAddressField(_('adresse IP'))
     user_agent = models.TextField(_('user agent'), blank=True)
     login_successful = models.BooleanField(_('connexion réussie'), default=True)
-    login_at = models.DateTimeField(_('date de connexion'), auto_now_add=True)
+    # Not auto_now_add: buffered rows keep the time of the attempt (see login_buffer)
+    login_at = models.DateTimeField(_('date de connexion'), default=timezone.now, editable=False)
     
     class Meta:
         verbose_name = _('historique de connexion')
         verbose_name_plural = _('historiques de connexion')
         ordering = ['-login_at']
+        indexes = [
+            models.Index(fields=['login_at']),
+            models.Index(fields=['user', '-login_at']),
+        ]
     
     def __str__(self):
         status = 'Succès' if self.login_successful else 'Échec'
@@ -377,7 +486,7 @@ class APIKey(models.Model):
     )
     name = models.CharField(_('nom'), max_length=100)
     key_prefix = models.CharField(_('préfixe de clé'), max_length=8)
-    key_hash = models.CharField(_('hash de clé'), max_length=128)
+    key_hash = models.CharField(_('hash de clé'), max_length=128)  # hex SHA-256
     is_active = models.BooleanField(_('active'), default=True)
     last_used_at = models.DateTimeField(_('dernière utilisation'), null=True, blank=True)
     created_at = models.DateTimeField(_('créé le'), auto_now_add=True)
@@ -387,6 +496,14 @@ class APIKey(models.Model):
         verbose_name = _('clé API')
         verbose_name_plural = _('clés API')
         ordering = ['-created_at']
+        indexes = [
+            # APIKey.verify only ever looks up active keys by prefix
+            models.Index(
+                fields=['key_prefix'],
+                condition=models.Q(is_active=True),
+                name='apikey_prefix_active_idx',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.key_prefix}...)"
@@ -396,6 +513,27 @@ class APIKey(models.Model):
         """Generate a new API key."""
         return generate_secure_token(32)
     
+    @staticmethod
+    def hash_key(raw_key: str) -> str:
+        """Hex SHA-256 of a raw key, as stored in key_hash."""
+        return hash_sensitive_data(raw_key)
+    
+    @classmethod
+    def verify(cls, raw_key: str):
+        """
+        Return the active, unexpired APIKey matching a raw key, or None.
+        Candidates are narrowed by prefix and compared in constant time.
+        """
+        key_hash = cls.hash_key(raw_key)
+        candidates = cls.objects.filter(
+            key_prefix=raw_key[:8], is_active=True
+        ).select_related('user')
+        
+        for api_key in candidates:
+            if hmac.compare_digest(api_key.key_hash, key_hash) and not api_key.is_expired:
+                return api_key
+        return None
+    
     @property
     def is_expired(self) -> bool:
         """Check if the key has expired."""
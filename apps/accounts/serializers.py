@@ -8,6 +8,8 @@ from rest_framework import serializers
 
 from .models import User, SellerProfile, CreditTransaction
 
+_PHONE_STRIP_TABLE = str.maketrans('', '', ' -+')
+
 
 class UserSerializer(serializers.ModelSerializer):
     """
@@ -39,8 +41,9 @@ class SellerProfileSerializer(serializers.ModelSerializer):
     """
     
     user = UserSerializer(read_only=True)
-    is_amazon_connected = serializers.BooleanField(read_only=True)
-    has_active_subscription = serializers.BooleanField(read_only=True)
+    # Read the SellerProfile.objects.with_status_flags() annotations when present
+    is_amazon_connected = serializers.SerializerMethodField()
+    has_active_subscription = serializers.SerializerMethodField()
     subscription_tier_display = serializers.CharField(
         source='get_subscription_tier_display',
         read_only=True
@@ -81,6 +84,16 @@ class SellerProfileSerializer(serializers.ModelSerializer):
             'total_estimated_recovery',
             'created_at',
         ]
+    
+    def get_is_amazon_connected(self, obj) -> bool:
+        if hasattr(obj, 'amazon_connected_flag'):
+            return obj.amazon_connected_flag
+        return obj.is_amazon_connected
+    
+    def get_has_active_subscription(self, obj) -> bool:
+        if hasattr(obj, 'active_subscription_flag'):
+            return obj.active_subscription_flag
+        return obj.has_active_subscription
 
 
 class CreditTransactionSerializer(serializers.ModelSerializer):
@@ -126,9 +139,9 @@ class UserProfileUpdateSerializer(serializers.ModelSerializer):
     def validate_phone(self, value):
         """Validate phone number format."""
         if value:
-            # Remove spaces and check format
-            cleaned = value.replace(' ', '').replace('-', '')
-            if not cleaned.replace('+', '').isdigit():
+            # Strip separators and '+' in one pass, then check format
+            cleaned = value.translate(_PHONE_STRIP_TABLE)
+            if not cleaned.isdigit():
                 raise serializers.ValidationError(
                     "Le numéro de téléphone contient des caractères invalides."
                 )
@@ -0,0 +1,57 @@
+"""
+Accounts Celery Tasks
+=====================
+Asynchronous tasks for user accounts.
+"""
+
+import logging
+
+from celery import shared_task
+from django.conf import settings
+from django.core.mail import send_mail
+
+from apps.accounts.login_buffer import flush_buffered_logins
+from apps.accounts.models import User
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def send_welcome_email(user_id: int):
+    """Send the welcome email to a newly registered user."""
+    try:
+        user = User.objects.get(pk=user_id)
+    except User.DoesNotExist:
+        return
+    
+    send_mail(
+        subject="Bienvenue sur Amazon Audit !",
+        message=f"""Bonjour {user.get_short_name()},
+
+Bienvenue sur Amazon Audit ! Votre compte a ete cree avec succes.
+
+Pour commencer a recuperer l'argent que Amazon vous doit :
+1. Connectez-vous a votre tableau de bord
+2. Importez vos rapports Amazon Seller Central
+3. Lancez votre premier audit gratuit
+
+Si vous avez des questions, n'hesitez pas a nous contacter.
+
+Cordialement,
+L'equipe Amazon Audit
+""",
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipient_list=[user.email],
+        fail_silently=True,
+    )
+    
+    logger.info(f"Welcome email sent to: {user.email}")
+
+
+@shared_task
+def flush_login_history():
+    """Write buffered login attempts to LoginHistory in batches."""
+    written = flush_buffered_logins()
+    if written:
+        logger.info(f"Flushed {written} buffered login(s)")
+    return {'written': written}
@@ -0,0 +1,217 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core import mail
+from django.core.cache.backends.redis import RedisCacheClient
+from django.db import DatabaseError
+from django.contrib import admin
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from apps.accounts.admin import SellerProfileAdmin, UserAdmin
+from apps.accounts.login_buffer import record_login
+from apps.accounts.models import SellerProfile, CreditTransaction, LoginHistory, APIKey
+from apps.accounts.tasks import flush_login_history
+from utils.testing import REDIS_CACHES, FakeRedisList
+
+User = get_user_model()
+
+
+class AccountSignalsTests(TestCase):
+    def test_registration_creates_profile_and_queues_welcome_email(self):
+        """Test the welcome email goes out only once the user is committed."""
+        with self.captureOnCommitCallbacks() as callbacks:
+            user = User.objects.create_user(
+                email='seller@example.com',
+                password='testpassword123'
+            )
+            self.assertEqual(len(mail.outbox), 0)
+
+        self.assertTrue(SellerProfile.objects.filter(user=user).exists())
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['seller@example.com'])
+
+    def test_login_recorded_without_redis_buffer(self):
+        """Test logins are written directly when the cache is not Redis."""
+        user = User.objects.create_user(email='seller@example.com', password='testpassword123')
+
+        self.client.login(email='seller@example.com', password='testpassword123')
+        self.client.login(email='seller@example.com', password='wrong-password')
+
+        history = LoginHistory.objects.filter(user=user)
+        self.assertEqual(history.filter(login_successful=True).count(), 1)
+        self.assertEqual(history.filter(login_successful=False).count(), 1)
+
+    @override_settings(CACHES=REDIS_CACHES)
+    def test_login_buffered_in_redis_and_flushed(self):
+        """Test logins are buffered in Redis and written by the flush task."""
+        user = User.objects.create_user(email='seller@example.com', password='testpassword123')
+        redis_client = FakeRedisList()
+
+        with mock.patch.object(RedisCacheClient, 'get_client', return_value=redis_client):
+            record_login(user.pk, '127.0.0.1', 'agent', login_successful=True)
+            self.assertFalse(LoginHistory.objects.filter(user=user).exists())
+
+            self.assertEqual(flush_login_history(), {'written': 1})
+
+        login = LoginHistory.objects.get(user=user)
+        self.assertTrue(login.login_successful)
+        self.assertEqual(login.ip_address, '127.0.0.1')
+
+    @override_settings(CACHES=REDIS_CACHES)
+    def test_buffered_logins_kept_when_flush_fails(self):
+        """Test a batch that fails to insert stays buffered for the next flush."""
+        user = User.objects.create_user(email='seller@example.com', password='testpassword123')
+        redis_client = FakeRedisList()
+
+        with mock.patch.object(RedisCacheClient, 'get_client', return_value=redis_client):
+            record_login(user.pk, '127.0.0.1', 'agent', login_successful=True)
+
+            with mock.patch.object(LoginHistory.objects, 'bulk_create', side_effect=DatabaseError):
+                with self.assertRaises(DatabaseError):
+                    flush_login_history()
+
+            self.assertEqual(flush_login_history(), {'written': 1})
+
+
+class CreditBalanceTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(email='seller@example.com', password='testpassword123')
+        self.seller_profile = user.seller_profile
+
+    def test_add_and_deduct_credits(self):
+        """Test credit updates apply in the database and log ledger entries."""
+        self.seller_profile.add_credits(10, 'Achat')
+        self.assertEqual(self.seller_profile.credits_balance, 10)
+
+        self.assertTrue(self.seller_profile.deduct_credits(4, 'Téléchargement'))
+        self.assertEqual(self.seller_profile.credits_balance, 6)
+        self.assertEqual(self.seller_profile.credit_transactions.count(), 2)
+        self.assertEqual(
+            set(self.seller_profile.credit_transactions.values_list('user_email', flat=True)),
+            {'seller@example.com'}
+        )
+
+    def test_deduct_uses_stored_balance(self):
+        """Test a stale in-memory balance cannot overdraw the account."""
+        self.seller_profile.add_credits(5)
+        stale = SellerProfile.objects.get(pk=self.seller_profile.pk)
+        self.seller_profile.deduct_credits(5)
+
+        self.assertFalse(stale.deduct_credits(5))
+        stale.refresh_from_db()
+        self.assertEqual(stale.credits_balance, 0)
+
+    def test_bulk_apply_groups_balance_updates(self):
+        """Test bulk ledger entries land in one pass and sum per profile."""
+        other = User.objects.create_user(email='other@example.com', password='testpassword123')
+        bonus = CreditTransaction.TransactionType.BONUS
+
+        # Email lookup, then savepoint, one INSERT, one UPDATE, savepoint release
+        with self.assertNumQueries(5):
+            CreditTransaction.bulk_apply([
+                CreditTransaction(seller_profile=self.seller_profile, amount=3, transaction_type=bonus),
+                CreditTransaction(seller_profile=self.seller_profile, amount=2, transaction_type=bonus),
+                CreditTransaction(seller_profile=other.seller_profile, amount=7, transaction_type=bonus),
+            ])
+
+        self.seller_profile.refresh_from_db()
+        other.seller_profile.refresh_from_db()
+        self.assertEqual(self.seller_profile.credits_balance, 5)
+        self.assertEqual(other.seller_profile.credits_balance, 7)
+        self.assertEqual(
+            CreditTransaction.objects.get(seller_profile=other.seller_profile).user_email,
+            'other@example.com'
+        )
+
+
+class SellerProfileStatusFlagsTests(TestCase):
+    def test_status_flags_match_properties(self):
+        """Test the SQL status flags agree with the model properties."""
+        now = timezone.now()
+        states = [
+            {'amazon_seller_id': 'A1', 'subscription_tier': 'pro'},
+            {'amazon_seller_id': 'A2', 'amazon_token_expires_at': now - timedelta(days=1)},
+            {'amazon_seller_id': '', 'subscription_tier': 'starter',
+             'subscription_ends_at': now - timedelta(days=1)},
+            {'subscription_tier': 'enterprise', 'subscription_ends_at': now + timedelta(days=5)},
+        ]
+        for index, fields in enumerate(states):
+            user = User.objects.create_user(email=f'seller{index}@example.com', password='pw')
+            SellerProfile.objects.filter(user=user).update(**fields)
+
+        for profile in SellerProfile.objects.with_status_flags():
+            self.assertEqual(profile.amazon_connected_flag, profile.is_amazon_connected)
+            self.assertEqual(profile.active_subscription_flag, profile.has_active_subscription)
+
+    def test_disconnect_amazon_skips_write_when_already_disconnected(self):
+        """Test disconnecting twice only writes the first time."""
+        user = User.objects.create_user(email='seller@example.com', password='pw')
+        profile = user.seller_profile
+        SellerProfile.objects.filter(pk=profile.pk).update(
+            amazon_seller_id='A1', amazon_marketplace_ids=['A13V1IB3VIYZZH']
+        )
+        profile.refresh_from_db()
+
+        self.assertTrue(profile.disconnect_amazon())
+        with self.assertNumQueries(0):
+            self.assertFalse(profile.disconnect_amazon())
+
+
+class APIKeyTests(TestCase):
+    def test_verify_matches_hashed_key(self):
+        """Test a raw key verifies against its stored hash and prefix only."""
+        user = User.objects.create_user(email='seller@example.com', password='testpassword123')
+        raw_key = APIKey.generate_key()
+        api_key = APIKey.objects.create(
+            user=user, name='CI', key_prefix=raw_key[:8], key_hash=APIKey.hash_key(raw_key)
+        )
+
+        self.assertEqual(APIKey.verify(raw_key), api_key)
+        self.assertIsNone(APIKey.verify(raw_key[:8] + 'x' * 16))
+
+        api_key.expires_at = timezone.now() - timedelta(minutes=1)
+        api_key.save(update_fields=['expires_at'])
+        self.assertIsNone(APIKey.verify(raw_key))
+
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class SellerProfileMiddlewareTests(TestCase):
+    def test_profile_page_uses_request_profile(self):
+        """Test the request-scoped profile is the signed-in user's profile."""
+        user = User.objects.create_user(email='seller@example.com', password='testpassword123')
+        self.client.login(email='seller@example.com', password='testpassword123')
+
+        response = self.client.get(reverse('accounts:profile'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['seller_profile'].pk, user.seller_profile.pk)
+
+
+class UserAdminTests(TestCase):
+    def test_display_name_column_matches_model(self):
+        """Test the annotated display name gives the same output as User.display_name."""
+        User.objects.create_user(email='company@example.com', password='testpassword123', company_name='ACME')
+        User.objects.create_user(email='named@example.com', password='testpassword123', first_name='Jean', last_name='Dupont')
+        User.objects.create_user(email='blank@example.com', password='testpassword123')
+
+        user_admin = UserAdmin(User, admin.site)
+        for user in user_admin.get_queryset(RequestFactory().get('/')):
+            with self.subTest(email=user.email):
+                self.assertEqual(user_admin.display_name(user), User.objects.get(pk=user.pk).display_name)
+
+    def test_seller_profile_changelist_reads_connection_flag(self):
+        """Test the Amazon column uses the annotated flag instead of the per-row property."""
+        user = User.objects.create_user(email='seller@example.com', password='testpassword123')
+        SellerProfile.objects.filter(user=user).update(amazon_seller_id='A1')
+
+        profile_admin = SellerProfileAdmin(SellerProfile, admin.site)
+        profile = profile_admin.get_queryset(RequestFactory().get('/')).get(user=user)
+        with mock.patch.object(SellerProfile, 'is_amazon_connected', new_callable=mock.PropertyMock) as prop:
+            self.assertIn('✓', profile_admin.is_amazon_connected_display(profile))
+        prop.assert_not_called()
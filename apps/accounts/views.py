@@ -13,12 +13,16 @@ from django.shortcuts import render, redirect
 from django.urls import reverse_lazy
 from django.views.generic import TemplateView, UpdateView, FormView
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db import transaction
 
-from .models import User, SellerProfile, LoginHistory
+from .models import User, CreditTransaction, LoginHistory
 from .forms import UserProfileForm, ChangeEmailForm, DeleteAccountForm
 
 logger = logging.getLogger(__name__)
 
+# Columns shown in login history listings; served by the (user, -login_at) index
+LOGIN_HISTORY_FIELDS = ('ip_address', 'login_at', 'login_successful', 'user__email')
+
 
 class ProfileView(LoginRequiredMixin, TemplateView):
     """
@@ -30,12 +34,11 @@ class ProfileView(LoginRequiredMixin, TemplateView):
         context = super().get_context_data(**kwargs)
         user = self.request.user
         
-        # Get or create seller profile
-        seller_profile, created = SellerProfile.objects.get_or_create(user=user)
-        
         context['user'] = user
-        context['seller_profile'] = seller_profile
-        context['recent_logins'] = LoginHistory.objects.filter(user=user)[:5]
+        context['seller_profile'] = self.request.seller_profile
+        context['recent_logins'] = LoginHistory.objects.select_related('user').filter(
+            user=user
+        ).order_by('-login_at').only(*LOGIN_HISTORY_FIELDS)[:5]
         
         return context
 
@@ -132,8 +135,13 @@ class AccountSecurityView(LoginRequiredMixin, TemplateView):
         context = super().get_context_data(**kwargs)
         user = self.request.user
         
-        context['login_history'] = LoginHistory.objects.filter(user=user)[:20]
-        context['api_keys'] = user.api_keys.filter(is_active=True)
+        context['login_history'] = LoginHistory.objects.select_related('user').filter(
+            user=user
+        ).order_by('-login_at').only(*LOGIN_HISTORY_FIELDS)[:20]
+        # Listing never needs the key hash
+        context['api_keys'] = user.api_keys.filter(is_active=True).only(
+            'id', 'name', 'key_prefix', 'is_active', 'last_used_at', 'expires_at'
+        )
         
         return context
 
@@ -146,12 +154,14 @@ class SubscriptionView(LoginRequiredMixin, TemplateView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        user = self.request.user
-        
-        seller_profile, created = SellerProfile.objects.get_or_create(user=user)
+        seller_profile = self.request.seller_profile
         
         context['seller_profile'] = seller_profile
-        context['credit_transactions'] = seller_profile.credit_transactions.all()[:10]
+        context['credit_transactions'] = CreditTransaction.objects.filter(
+            seller_profile=seller_profile
+        ).only(
+            'amount', 'transaction_type', 'description', 'reference', 'user_email', 'created_at',
+        ).order_by('-created_at')[:10]
         
         return context
 
@@ -165,11 +175,12 @@ def disconnect_amazon(request):
         user = request.user
         
         if hasattr(user, 'seller_profile'):
-            user.seller_profile.disconnect_amazon()
-            
-            # Also delete stored credentials
             from apps.amazon_integration.models import AmazonCredentials
-            AmazonCredentials.objects.filter(seller_profile=user.seller_profile).delete()
+            
+            # Profile reset and credential removal succeed or fail together
+            with transaction.atomic():
+                user.seller_profile.disconnect_amazon()
+                AmazonCredentials.objects.filter(seller_profile=user.seller_profile).delete()
             
             logger.info(f"User {user.pk} disconnected their Amazon account")
             
@@ -4,10 +4,50 @@ Amazon Integration Admin
 Django admin configuration for Amazon integration monitoring.
 """
 
+from datetime import timedelta
+
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db.models import BooleanField, Case, Q, Value, When
+from django.db.models.functions import Substr
+from django.utils import timezone
+from django.utils.functional import cached_property
 from django.utils.html import format_html
 
-from .models import AmazonCredentials, APIRequestLog, ReportRequest
+from utils.helpers import approx_count
+
+from .models import REPORT_TYPE_LABELS, AmazonCredentials, APIRequestLog, ReportRequest
+
+
+ENDPOINT_SHORT_LENGTH = 50
+
+
+def is_changelist(request) -> bool:
+    """Whether the admin request is a changelist page rather than a detail view."""
+    match = request.resolver_match
+    return match is not None and match.url_name.endswith('_changelist')
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for large log tables: an unfiltered changelist uses the
+    planner's row estimate instead of a full COUNT(*).
+    """
+    
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            return approx_count(self.object_list.model)
+        return super().count
+
+
+def build_status_badges(choices, colors):
+    """Render the badge of every status once; statuses are a closed enum."""
+    return {
+        value: format_html('<span style="color: {};">{}</span>', colors.get(value, 'gray'), label)
+        for value, label in choices
+    }
 
 
 @admin.register(AmazonCredentials)
@@ -23,6 +63,8 @@ class AmazonCredentialsAdmin(admin.ModelAdmin):
         'updated_at',
     )
     list_filter = ('updated_at',)
+    list_select_related = ('seller_profile__user',)
+    raw_id_fields = ('seller_profile',)
     search_fields = (
         'seller_profile__user__email',
         'seller_id',
@@ -40,10 +82,31 @@ class AmazonCredentialsAdmin(admin.ModelAdmin):
     # Never show encrypted tokens
     exclude = ('_refresh_token_encrypted', '_access_token_encrypted', 'oauth_state')
     
+    def get_queryset(self, request):
+        # Token validity is decided in SQL (a NULL expiry counts as expired):
+        # no blob transfer, no decrypt per row.
+        # The blobs are excluded from the form, so the detail view skips them too
+        valid_until = timezone.now() + timedelta(minutes=5)
+        return super().get_queryset(request).select_related(
+            'seller_profile__user'
+        ).defer(
+            '_access_token_encrypted', '_refresh_token_encrypted'
+        ).annotate(
+            _token_ok=Case(
+                When(
+                    Q(_access_token_encrypted__isnull=False)
+                    & Q(access_token_expires_at__gt=valid_until),
+                    then=Value(True),
+                ),
+                default=Value(False),
+                output_field=BooleanField(),
+            )
+        )
+    
     def get_token_status(self, obj):
-        if obj.is_access_token_valid:
-            return format_html('<span style="color: green;">✓ Valide</span>')
-        return format_html('<span style="color: orange;">⚠ Expiré</span>')
+        return obj._token_ok
+    get_token_status.boolean = True
+    get_token_status.admin_order_field = '_token_ok'
     get_token_status.short_description = 'Token'
 
 
@@ -62,6 +125,9 @@ class APIRequestLogAdmin(admin.ModelAdmin):
         'request_at',
     )
     list_filter = ('status', 'method', 'request_at')
+    list_select_related = ('seller_profile__user',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     search_fields = ('endpoint', 'seller_profile__user__email')
     readonly_fields = (
         'seller_profile',
@@ -79,26 +145,35 @@ class APIRequestLogAdmin(admin.ModelAdmin):
     )
     date_hierarchy = 'request_at'
     
+    def get_queryset(self, request):
+        # Fetch only the start of the endpoint for the list and skip the
+        # large response/params columns the list never shows
+        qs = super().get_queryset(request)
+        if is_changelist(request):
+            qs = qs.annotate(
+                _endpoint_short=Substr('endpoint', 1, ENDPOINT_SHORT_LENGTH + 1)
+            ).defer('endpoint', 'response_body', '_request_params_compressed')
+        return qs
+    
     def endpoint_short(self, obj):
         """Show truncated endpoint."""
-        if len(obj.endpoint) > 50:
-            return obj.endpoint[:50] + '...'
-        return obj.endpoint
+        endpoint = getattr(obj, '_endpoint_short', None)
+        if endpoint is None:
+            endpoint = obj.endpoint
+        if len(endpoint) > ENDPOINT_SHORT_LENGTH:
+            return endpoint[:ENDPOINT_SHORT_LENGTH] + '...'
+        return endpoint
     endpoint_short.short_description = 'Endpoint'
     
+    STATUS_BADGES = build_status_badges(APIRequestLog.RequestStatus.choices, {
+        'pending': 'gray',
+        'success': 'green',
+        'failed': 'red',
+        'throttled': 'orange',
+    })
+    
     def status_badge(self, obj):
-        colors = {
-            'pending': 'gray',
-            'success': 'green',
-            'failed': 'red',
-            'throttled': 'orange',
-        }
-        color = colors.get(obj.status, 'gray')
-        return format_html(
-            '<span style="color: {};">{}</span>',
-            color,
-            obj.get_status_display()
-        )
+        return self.STATUS_BADGES.get(obj.status) or obj.status
     status_badge.short_description = 'Statut'
     
     def has_add_permission(self, request):
@@ -115,7 +190,7 @@ class ReportRequestAdmin(admin.ModelAdmin):
     list_display = (
         'id',
         'seller_profile',
-        'report_type',
+        'report_type_label',
         'status_badge',
         'data_start_date',
         'data_end_date',
@@ -123,6 +198,9 @@ class ReportRequestAdmin(admin.ModelAdmin):
         'created_at',
     )
     list_filter = ('status', 'report_type', 'created_at')
+    list_select_related = ('seller_profile__user',)
+    show_full_result_count = False
+    raw_id_fields = ('seller_profile',)
     search_fields = (
         'seller_profile__user__email',
         'report_id',
@@ -165,19 +243,36 @@ class ReportRequestAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        # Select exactly the list_display columns on the changelist
+        qs = super().get_queryset(request)
+        if is_changelist(request):
+            qs = qs.only(
+                'id',
+                'seller_profile__user__email',
+                'report_type',
+                'status',
+                'data_start_date',
+                'data_end_date',
+                'row_count',
+                'created_at',
+            )
+        return qs
+    
+    def report_type_label(self, obj):
+        return REPORT_TYPE_LABELS.get(obj.report_type, obj.report_type)
+    report_type_label.short_description = 'Type de rapport'
+    report_type_label.admin_order_field = 'report_type'
+    
+    STATUS_BADGES = build_status_badges(ReportRequest.ReportStatus.choices, {
+        'pending': 'gray',
+        'processing': 'blue',
+        'done': 'green',
+        'downloaded': 'darkgreen',
+        'failed': 'red',
+        'cancelled': 'orange',
+    })
+    
     def status_badge(self, obj):
-        colors = {
-            'pending': 'gray',
-            'processing': 'blue',
-            'done': 'green',
-            'downloaded': 'darkgreen',
-            'failed': 'red',
-            'cancelled': 'orange',
-        }
-        color = colors.get(obj.status, 'gray')
-        return format_html(
-            '<span style="color: {};">{}</span>',
-            color,
-            obj.get_status_display()
-        )
+        return self.STATUS_BADGES.get(obj.status) or obj.status
     status_badge.short_description = 'Statut'
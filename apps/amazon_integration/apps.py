@@ -10,3 +10,7 @@ class AmazonIntegrationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.amazon_integration'
     verbose_name = 'Intégration Amazon SP-API'
+    
+    def ready(self):
+        """Import signals when the app is ready."""
+        import apps.amazon_integration.signals  # noqa: F401
@@ -0,0 +1,124 @@
+"""
+Amazon Integration Log Buffer
+=============================
+Buffer APIRequestLog rows in Redis and write them in batches.
+
+The SP-API client builds each log entry in memory and queues it once the
+call has finished, so a request costs one Redis push instead of an INSERT
+and an UPDATE. The `flush_api_request_logs` task drains the list with
+bulk_create. Without a Redis cache (development, local-memory fallback) or
+when Redis is unreachable, entries are written straight to the database.
+
+Only finished entries are buffered, so rows written through the buffer are
+never in the pending state.
+"""
+
+import json
+import logging
+
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from django.utils.dateparse import parse_datetime
+
+from apps.accounts.models import SellerProfile
+from apps.amazon_integration.models import APIRequestLog
+
+logger = logging.getLogger(__name__)
+
+API_REQUEST_LOG_BUFFER_KEY = 'amazon_integration:api_request_log_buffer'
+FLUSH_BATCH_SIZE = 500
+
+BUFFERED_FIELDS = (
+    'seller_profile_id',
+    'endpoint',
+    'method',
+    'request_params',
+    'status',
+    'http_status_code',
+    'response_body',
+    'error_message',
+    'request_at',
+    'response_at',
+    'duration_ms',
+    'retry_count',
+)
+DATETIME_FIELDS = ('request_at', 'response_at')
+
+
+def _get_redis_client():
+    """Return the raw redis client behind the default cache, if it is Redis."""
+    # django.core.cache.cache is a proxy; check the backend behind it
+    backend = caches['default']
+    if not isinstance(backend, RedisCache):
+        return None
+    return backend._cache.get_client(API_REQUEST_LOG_BUFFER_KEY, write=True)
+
+
+def _serialize(log_entry: APIRequestLog) -> str:
+    entry = {field: getattr(log_entry, field) for field in BUFFERED_FIELDS}
+    for field in DATETIME_FIELDS:
+        if entry[field] is not None:
+            entry[field] = entry[field].isoformat()
+    return json.dumps(entry, default=str)
+
+
+def _deserialize(raw) -> dict:
+    entry = json.loads(raw)
+    for field in DATETIME_FIELDS:
+        if entry[field] is not None:
+            entry[field] = parse_datetime(entry[field])
+    return entry
+
+
+def queue_request_log(log_entry: APIRequestLog):
+    """Buffer a finished log entry, or insert it immediately when Redis is unavailable."""
+    client = _get_redis_client()
+    if client is not None:
+        try:
+            client.rpush(API_REQUEST_LOG_BUFFER_KEY, _serialize(log_entry))
+            return
+        except Exception as e:
+            logger.warning(f"API log buffer unavailable ({e}). Writing request log directly.")
+
+    log_entry.save()
+
+
+def flush_buffered_request_logs() -> int:
+    """Move buffered API request logs into APIRequestLog. Returns the rows written."""
+    client = _get_redis_client()
+    if client is None:
+        return 0
+
+    written = 0
+    while True:
+        pipe = client.pipeline()
+        pipe.lrange(API_REQUEST_LOG_BUFFER_KEY, 0, FLUSH_BATCH_SIZE - 1)
+        pipe.ltrim(API_REQUEST_LOG_BUFFER_KEY, FLUSH_BATCH_SIZE, -1)
+        raw_entries, _ = pipe.execute()
+        if not raw_entries:
+            break
+
+        entries = [_deserialize(raw) for raw in raw_entries]
+
+        # Sellers deleted since their request was buffered are dropped
+        existing_ids = set(SellerProfile.objects.filter(
+            pk__in={entry['seller_profile_id'] for entry in entries}
+        ).values_list('pk', flat=True))
+
+        rows = [
+            APIRequestLog(**entry)
+            for entry in entries
+            if entry['seller_profile_id'] is None or entry['seller_profile_id'] in existing_ids
+        ]
+        try:
+            APIRequestLog.objects.bulk_create(rows, batch_size=FLUSH_BATCH_SIZE)
+        except Exception:
+            # Put the batch back at the head of the list for the next flush
+            client.lpush(API_REQUEST_LOG_BUFFER_KEY, *reversed(raw_entries))
+            raise
+        written += len(rows)
+
+        if len(raw_entries) < FLUSH_BATCH_SIZE:
+            break
+
+    return written
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-15 23:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('amazon_integration', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='apirequestlog',
+            index=models.Index(fields=['seller_profile', 'status', '-request_at'], name='apilog_seller_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='apirequestlog',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'throttled'])), fields=['-request_at'], name='apilog_inflight_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reportrequest',
+            index=models.Index(fields=['seller_profile', 'status', '-created_at'], name='report_seller_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reportrequest',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'processing'])), fields=['-created_at'], name='report_inflight_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-15 23:23
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('amazon_integration', '0002_request_status_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='apirequestlog',
+            name='request_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='date de la requête'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.30 on 2026-10-15 23:24
+
+import json
+import zlib
+
+from django.db import migrations, models
+
+
+def compress_request_params(apps, schema_editor):
+    APIRequestLog = apps.get_model('amazon_integration', 'APIRequestLog')
+    logs = APIRequestLog.objects.exclude(request_params={}).only('pk', 'request_params')
+    batch = []
+    for log in logs.iterator(chunk_size=1000):
+        log._request_params_compressed = zlib.compress(
+            json.dumps(log.request_params, default=str).encode()
+        )
+        batch.append(log)
+        if len(batch) >= 1000:
+            APIRequestLog.objects.bulk_update(batch, ['_request_params_compressed'])
+            batch = []
+    if batch:
+        APIRequestLog.objects.bulk_update(batch, ['_request_params_compressed'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('amazon_integration', '0003_request_log_request_at_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='apirequestlog',
+            name='_request_params_compressed',
+            field=models.BinaryField(blank=True, null=True, verbose_name='paramètres (compressés)'),
+        ),
+        migrations.RunPython(compress_request_params, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='apirequestlog',
+            name='request_params',
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-15 23:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('amazon_integration', '0004_compress_request_params'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='amazoncredentials',
+            index=models.Index(condition=models.Q(('_access_token_encrypted__isnull', False)), fields=['access_token_expires_at'], name='amzn_cred_expiry_idx'),
+        ),
+    ]
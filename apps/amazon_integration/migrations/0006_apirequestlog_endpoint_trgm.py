@@ -0,0 +1,33 @@
+# Indexed substring search on API log endpoints (admin search) on PostgreSQL
+
+from django.db import migrations
+
+INDEX_NAME = 'apilog_endpoint_trgm'
+
+
+def create_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # Admin search compiles to UPPER(endpoint) LIKE UPPER(...), so index that
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {INDEX_NAME} ON amazon_integration_apirequestlog '
+        'USING gin (UPPER(endpoint) gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('amazon_integration', '0005_credentials_expiry_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
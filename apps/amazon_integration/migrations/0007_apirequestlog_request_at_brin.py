@@ -0,0 +1,32 @@
+# Compact range index on API log timestamps on PostgreSQL
+
+from django.db import migrations
+
+INDEX_NAME = 'apilog_request_at_brin'
+
+
+def create_brin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    # Rows are appended in request_at order, so block ranges map to time ranges
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {INDEX_NAME} ON amazon_integration_apirequestlog '
+        'USING brin (request_at)'
+    )
+
+
+def drop_brin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('amazon_integration', '0006_apirequestlog_endpoint_trgm'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_brin_index, drop_brin_index),
+    ]
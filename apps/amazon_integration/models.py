@@ -8,19 +8,39 @@ from django.db import models
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+from cryptography.exceptions import InvalidTag
 from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from django.conf import settings
 
 import base64
+import functools
 import hashlib
+import json
+import os
+import zlib
 
+# AES-GCM nonce length, stored in front of each ciphertext
+NONCE_SIZE = 12
 
-def get_encryption_key():
+
+def get_encryption_key() -> bytes:
     """
-    Generate a Fernet-compatible encryption key from Django's SECRET_KEY.
+    Derive the 32-byte token encryption key from Django's SECRET_KEY.
     """
-    key = hashlib.sha256(settings.SECRET_KEY.encode()).digest()
-    return base64.urlsafe_b64encode(key)
+    return hashlib.sha256(settings.SECRET_KEY.encode()).digest()
+
+
+@functools.lru_cache(maxsize=1)
+def get_cipher() -> AESGCM:
+    """Return the AES-GCM cipher for token encryption, built once per process."""
+    return AESGCM(get_encryption_key())
+
+
+@functools.lru_cache(maxsize=1)
+def get_legacy_fernet() -> Fernet:
+    """Return the Fernet cipher that encrypted tokens stored before AES-GCM."""
+    return Fernet(base64.urlsafe_b64encode(get_encryption_key()))
 
 
 class AmazonCredentials(models.Model):
@@ -92,48 +112,84 @@ class AmazonCredentials(models.Model):
     class Meta:
         verbose_name = _('credentials Amazon')
         verbose_name_plural = _('credentials Amazon')
+        indexes = [
+            # Credentials holding an access token, by expiry (token refresh job)
+            models.Index(
+                fields=['access_token_expires_at'],
+                condition=models.Q(_access_token_encrypted__isnull=False),
+                name='amzn_cred_expiry_idx',
+            ),
+        ]
     
     def __str__(self):
         return f"Credentials pour {self.seller_profile.user.email}"
     
-    def _encrypt(self, data: str) -> bytes:
+    @staticmethod
+    def _encrypt(data: str) -> bytes:
         """Encrypt a string value."""
         if not data:
             return None
-        fernet = Fernet(get_encryption_key())
-        return fernet.encrypt(data.encode())
+        nonce = os.urandom(NONCE_SIZE)
+        return nonce + get_cipher().encrypt(nonce, data.encode(), None)
     
-    def _decrypt(self, data: bytes) -> str:
+    @staticmethod
+    def _decrypt(data: bytes) -> str:
         """Decrypt a bytes value."""
         if not data:
             return None
-        fernet = Fernet(get_encryption_key())
-        return fernet.decrypt(data).decode()
+        data = bytes(data)
+        try:
+            plaintext = get_cipher().decrypt(data[:NONCE_SIZE], data[NONCE_SIZE:], None)
+        except InvalidTag:
+            # Written by the previous Fernet scheme; re-encrypted on next token update
+            plaintext = get_legacy_fernet().decrypt(data)
+        return plaintext.decode()
+    
+    def _get_decrypted(self, field_name: str) -> str:
+        """
+        Decrypt a token field, memoizing the plaintext on the instance.
+        The cache is keyed on the ciphertext object, so assigning the field
+        directly or reloading it with refresh_from_db() invalidates it.
+        """
+        encrypted = getattr(self, field_name)
+        cache_attr = f'{field_name}_cache'
+        cached = self.__dict__.get(cache_attr)
+        if cached is not None and cached[0] is encrypted:
+            return cached[1]
+        value = self._decrypt(encrypted)
+        self.__dict__[cache_attr] = (encrypted, value)
+        return value
+    
+    def _set_encrypted(self, field_name: str, value: str):
+        """Encrypt a token field and seed the plaintext cache."""
+        encrypted = self._encrypt(value)
+        setattr(self, field_name, encrypted)
+        self.__dict__[f'{field_name}_cache'] = (encrypted, value or None)
     
     @property
     def refresh_token(self) -> str:
         """Get decrypted refresh token."""
-        return self._decrypt(self._refresh_token_encrypted)
+        return self._get_decrypted('_refresh_token_encrypted')
     
     @refresh_token.setter
     def refresh_token(self, value: str):
         """Set and encrypt refresh token."""
-        self._refresh_token_encrypted = self._encrypt(value)
+        self._set_encrypted('_refresh_token_encrypted', value)
     
     @property
     def access_token(self) -> str:
         """Get decrypted access token."""
-        return self._decrypt(self._access_token_encrypted)
+        return self._get_decrypted('_access_token_encrypted')
     
     @access_token.setter
     def access_token(self, value: str):
         """Set and encrypt access token."""
-        self._access_token_encrypted = self._encrypt(value)
+        self._set_encrypted('_access_token_encrypted', value)
     
     @property
     def is_access_token_valid(self) -> bool:
-        """Check if access token is still valid."""
-        if not self.access_token or not self.access_token_expires_at:
+        """Check if access token is still valid (without decrypting it)."""
+        if not self._access_token_encrypted or not self.access_token_expires_at:
             return False
         # Add 5 minute buffer
         return self.access_token_expires_at > timezone.now() + timezone.timedelta(minutes=5)
@@ -150,15 +206,13 @@ class AmazonCredentials(models.Model):
         self.access_token = access_token
         self.access_token_expires_at = timezone.now() + timezone.timedelta(seconds=expires_in)
         
+        update_fields = ['_access_token_encrypted', 'access_token_expires_at', 'updated_at']
+        
         if refresh_token:
             self.refresh_token = refresh_token
+            update_fields.append('_refresh_token_encrypted')
         
-        self.save(update_fields=[
-            '_access_token_encrypted',
-            'access_token_expires_at',
-            '_refresh_token_encrypted' if refresh_token else None,
-            'updated_at'
-        ])
+        self.save(update_fields=update_fields)
 
 
 class APIRequestLog(models.Model):
@@ -184,7 +238,12 @@ class APIRequestLog(models.Model):
     # Request details
     endpoint = models.CharField(_('endpoint'), max_length=500)
     method = models.CharField(_('méthode HTTP'), max_length=10)
-    request_params = models.JSONField(_('paramètres'), default=dict, blank=True)
+    # zlib-compressed JSON, read and written through the request_params property
+    _request_params_compressed = models.BinaryField(
+        _('paramètres (compressés)'),
+        null=True,
+        blank=True
+    )
     
     # Response details
     status = models.CharField(
@@ -198,7 +257,7 @@ class APIRequestLog(models.Model):
     error_message = models.TextField(_('message d\'erreur'), blank=True)
     
     # Timing
-    request_at = models.DateTimeField(_('date de la requête'), auto_now_add=True)
+    request_at = models.DateTimeField(_('date de la requête'), default=timezone.now, editable=False)
     response_at = models.DateTimeField(_('date de la réponse'), null=True, blank=True)
     duration_ms = models.IntegerField(_('durée (ms)'), null=True, blank=True)
     
@@ -213,11 +272,55 @@ class APIRequestLog(models.Model):
             models.Index(fields=['seller_profile', '-request_at']),
             models.Index(fields=['status', '-request_at']),
             models.Index(fields=['endpoint', '-request_at']),
+            models.Index(
+                fields=['seller_profile', 'status', '-request_at'],
+                name='apilog_seller_status_idx',
+            ),
+            # Requests still in flight, a small slice of the log (buffered
+            # entries are only queued once finished, see log_buffer.py)
+            models.Index(
+                fields=['-request_at'],
+                condition=models.Q(status__in=['pending', 'throttled']),
+                name='apilog_inflight_idx',
+            ),
         ]
     
     def __str__(self):
         return f"{self.method} {self.endpoint} - {self.status}"
     
+    @property
+    def request_params(self) -> dict:
+        """Get the decompressed request parameters."""
+        if not self._request_params_compressed:
+            return {}
+        return json.loads(zlib.decompress(bytes(self._request_params_compressed)))
+    request_params.fget.short_description = _('paramètres')
+    
+    @request_params.setter
+    def request_params(self, value: dict):
+        """Set and compress the request parameters."""
+        self._request_params_compressed = (
+            zlib.compress(json.dumps(value, default=str).encode()) if value else None
+        )
+    
+    def queue(self):
+        """
+        Hand a new log entry to the write buffer instead of inserting it now.
+        Queuing is idempotent, so callers may queue again on the way out.
+        """
+        if not self._state.adding or getattr(self, '_queued', False):
+            return
+        from .log_buffer import queue_request_log
+        self._queued = True
+        queue_request_log(self)
+    
+    def _save_result(self, update_fields: list):
+        """Queue an entry that was never written, or update the stored row."""
+        if self._state.adding:
+            self.queue()
+        else:
+            self.save(update_fields=update_fields)
+    
     def mark_success(self, http_status_code: int, response_body: str = ''):
         """Mark the request as successful."""
         self.status = self.RequestStatus.SUCCESS
@@ -229,7 +332,13 @@ class APIRequestLog(models.Model):
             delta = self.response_at - self.request_at
             self.duration_ms = int(delta.total_seconds() * 1000)
         
-        self.save()
+        self._save_result([
+            'status',
+            'http_status_code',
+            'response_body',
+            'response_at',
+            'duration_ms'
+        ])
     
     def mark_failed(self, http_status_code: int = None, error_message: str = ''):
         """Mark the request as failed."""
@@ -242,7 +351,13 @@ class APIRequestLog(models.Model):
             delta = self.response_at - self.request_at
             self.duration_ms = int(delta.total_seconds() * 1000)
         
-        self.save()
+        self._save_result([
+            'status',
+            'http_status_code',
+            'error_message',
+            'response_at',
+            'duration_ms'
+        ])
     
     def mark_throttled(self, retry_after: int = None):
         """Mark the request as throttled (rate limited)."""
@@ -250,7 +365,7 @@ class APIRequestLog(models.Model):
         self.http_status_code = 429
         self.error_message = f"Rate limited. Retry after: {retry_after}s" if retry_after else "Rate limited"
         self.response_at = timezone.now()
-        self.save()
+        self._save_result(['status', 'http_status_code', 'error_message', 'response_at'])
 
 
 class ReportRequest(models.Model):
@@ -368,10 +483,21 @@ class ReportRequest(models.Model):
             models.Index(fields=['seller_profile', 'report_type', '-created_at']),
             models.Index(fields=['status', '-created_at']),
             models.Index(fields=['report_id']),
+            models.Index(
+                fields=['seller_profile', 'status', '-created_at'],
+                name='report_seller_status_idx',
+            ),
+            # Reports still being polled from Amazon
+            models.Index(
+                fields=['-created_at'],
+                condition=models.Q(status__in=['pending', 'processing']),
+                name='report_inflight_idx',
+            ),
         ]
     
     def __str__(self):
-        return f"{self.get_report_type_display()} - {self.seller_profile.user.email}"
+        label = REPORT_TYPE_LABELS.get(self.report_type, self.report_type)
+        return f"{label} - {self.seller_profile.user.email}"
     
     def mark_processing(self, report_id: str):
         """Mark the report as processing (Amazon has accepted the request)."""
@@ -410,3 +536,7 @@ class ReportRequest(models.Model):
         self.status = self.ReportStatus.FAILED
         self.error_message = error_message
         self.save(update_fields=['status', 'error_message', 'updated_at'])
+
+
+# Choice labels by value, for per-row display without rebuilding flatchoices
+REPORT_TYPE_LABELS = dict(ReportRequest.ReportType.choices)
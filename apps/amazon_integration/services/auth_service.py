@@ -6,16 +6,20 @@ Handles OAuth2 LWA (Login with Amazon) authentication flow.
 
 import logging
 import secrets
+import time
 from typing import Dict, Optional, Tuple
 from urllib.parse import urlencode
 
 import requests
 from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
 
 from apps.accounts.models import SellerProfile
 from apps.amazon_integration.models import AmazonCredentials
+from apps.amazon_integration.services.http import session, token_refresh_session
 from utils.exceptions import AmazonAuthenticationError, AmazonTokenExpiredError
+from utils.helpers import hash_sensitive_data
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +31,35 @@ LWA_AUTHORIZE_URL = 'https://www.amazon.com/ap/oa'
 # SP-API endpoints for seller info
 SP_API_BASE_URL = 'https://sellingpartnerapi-eu.amazon.com'
 
+# Access tokens are shared between workers through the cache (encrypted),
+# expiring this long before Amazon's expiry
+ACCESS_TOKEN_CACHE_BUFFER = 300
+# A worker refreshing a token holds this lock; the others wait for its result
+REFRESH_LOCK_TIMEOUT = 30
+REFRESH_WAIT_SECONDS = 5
+
+# Marketplace participations rarely change: connection checks revalidate the
+# last response with its ETag, and a 304 carries no body
+SELLER_INFO_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Pending OAuth states live in the cache until the callback (or this timeout).
+# A copy is kept in the user's session for deployments whose cache is not
+# shared between processes (LocMemCache without REDIS_URL).
+OAUTH_STATE_TIMEOUT = 10 * 60
+OAUTH_STATE_SESSION_KEY = 'amazon_oauth_state'
+
+# A successful connection check is trusted for this long; past it, the next
+# check asks Amazon again
+CONNECTION_VERIFIED_TIMEOUT = 5 * 60
+
+
+def _lwa_error(response: requests.Response) -> str:
+    """Return the OAuth error code of an LWA error response."""
+    try:
+        return response.json().get('error', '')
+    except ValueError:
+        return ''
+
 
 class AmazonAuthService:
     """
@@ -60,13 +93,19 @@ class AmazonAuthService:
             # but methods needing auth will fail or should check.
 
     
-    def get_authorization_url(self, redirect_uri: str, marketplace_id: str = None) -> Tuple[str, str]:
+    def get_authorization_url(
+        self,
+        redirect_uri: str,
+        marketplace_id: str = None,
+        user_session=None
+    ) -> Tuple[str, str]:
         """
         Generate the Amazon OAuth authorization URL.
         
         Args:
             redirect_uri: URL to redirect after authorization
             marketplace_id: Optional marketplace ID to pre-select
+            user_session: Optional session of the user, also used to store the state
             
         Returns:
             Tuple of (authorization_url, state_token)
@@ -81,7 +120,19 @@ class AmazonAuthService:
             'version': 'beta',  # Required for SP-API
         }
         
-        # Store state in session or database for verification
+        # Store state for verification in the callback
+        cache_key = self._oauth_state_cache_key(state)
+        pending = {
+            'seller_profile_id': self.seller_profile.pk if self.seller_profile else None,
+            'redirect_uri': redirect_uri,
+        }
+        cache.set(cache_key, pending, timeout=OAUTH_STATE_TIMEOUT)
+        if user_session is not None:
+            user_session[OAUTH_STATE_SESSION_KEY] = {
+                'key': cache_key,
+                'expires_at': time.time() + OAUTH_STATE_TIMEOUT,
+                **pending,
+            }
         
         url = f"{LWA_AUTHORIZE_URL}?{urlencode(params)}"
         
@@ -89,6 +140,51 @@ class AmazonAuthService:
         
         return url, state
     
+    def consume_state(self, state: str, user_session=None) -> Optional[str]:
+        """
+        Verify an OAuth state returned by Amazon. A state can only be used once.
+        
+        Args:
+            state: State token from the callback
+            user_session: Optional session the state was also stored in
+            
+        Returns:
+            The redirect URI the state was issued for, or None if the state is
+            unknown, expired or was issued for another seller
+        """
+        session_pending = (
+            user_session.pop(OAUTH_STATE_SESSION_KEY, None) if user_session is not None else None
+        )
+        if not state:
+            return None
+        
+        cache_key = self._oauth_state_cache_key(state)
+        pending = cache.get(cache_key)
+        # Only the caller that deletes the key may use it, so a state
+        # replayed concurrently is accepted once
+        if pending is not None and not cache.delete(cache_key):
+            return None
+        
+        if pending is None:
+            # The callback may be served by a process that can't see the cache entry
+            if (
+                not session_pending
+                or session_pending['key'] != cache_key
+                or session_pending['expires_at'] < time.time()
+            ):
+                return None
+            pending = session_pending
+        
+        seller_profile_id = self.seller_profile.pk if self.seller_profile else None
+        if pending['seller_profile_id'] != seller_profile_id:
+            return None
+        
+        return pending['redirect_uri']
+    
+    @staticmethod
+    def _oauth_state_cache_key(state: str) -> str:
+        return f"amazon:oauth_state:{hash_sensitive_data(state)[:32]}"
+    
     def exchange_authorization_code(
         self,
         authorization_code: str,
@@ -109,7 +205,7 @@ class AmazonAuthService:
         logger.info(f"Exchanging auth code for seller: {seller_profile.user.email}")
         
         try:
-            response = requests.post(
+            response = session.post(
                 LWA_TOKEN_URL,
                 data={
                     'grant_type': 'authorization_code',
@@ -149,28 +245,58 @@ class AmazonAuthService:
         credentials.access_token = access_token
         credentials.refresh_token = refresh_token
         credentials.access_token_expires_at = timezone.now() + timezone.timedelta(seconds=expires_in)
-        credentials.save()
-        
-        # Fetch seller info
+        credentials.save(update_fields=[
+            '_access_token_encrypted',
+            '_refresh_token_encrypted',
+            'access_token_expires_at',
+            'updated_at'
+        ])
+        self._cache_access_token(credentials, access_token, expires_in)
         self.credentials = credentials
-        seller_info = self._fetch_seller_info(access_token)
         
-        if seller_info:
-            credentials.seller_id = seller_info.get('seller_id', '')
-            credentials.marketplace_id = seller_info.get('marketplace_id', '')
-            credentials.marketplace_ids = seller_info.get('marketplace_ids', [])
-            credentials.save()
-            
-            # Update seller profile
-            seller_profile.amazon_seller_id = credentials.seller_id
-            seller_profile.amazon_marketplace_ids = credentials.marketplace_ids
-            seller_profile.amazon_connected_at = timezone.now()
-            seller_profile.amazon_token_expires_at = credentials.access_token_expires_at
-            seller_profile.save()
+        logger.info(f"Stored Amazon tokens for seller: {seller_profile.user.email}")
+        
+        return credentials
+    
+    def update_seller_info(self) -> bool:
+        """
+        Fetch the seller's marketplace participations and store them on the
+        credentials and the seller profile.
+        
+        Returns:
+            True if the seller info was fetched and saved
+        """
+        if not self.credentials:
+            raise AmazonAuthenticationError("No credentials available")
+        
+        seller_info = self._fetch_seller_info(self.get_valid_access_token())
+        if not seller_info:
+            return False
+        
+        credentials = self.credentials
+        credentials.seller_id = seller_info.get('seller_id', '')
+        credentials.marketplace_id = seller_info.get('marketplace_id', '')
+        credentials.marketplace_ids = seller_info.get('marketplace_ids', [])
+        credentials.save(update_fields=['seller_id', 'marketplace_id', 'marketplace_ids', 'updated_at'])
+        
+        # Update seller profile (QuerySet.update(): the save signals do not fire)
+        seller_profile = credentials.seller_profile
+        profile_fields = {
+            'amazon_seller_id': credentials.seller_id,
+            'amazon_marketplace_ids': credentials.marketplace_ids,
+            'amazon_connected_at': timezone.now(),
+            'amazon_token_expires_at': credentials.access_token_expires_at,
+        }
+        SellerProfile.objects.filter(pk=seller_profile.pk).update(
+            **profile_fields,
+            updated_at=timezone.now(),
+        )
+        for field, value in profile_fields.items():
+            setattr(seller_profile, field, value)
         
         logger.info(f"Successfully authenticated seller: {credentials.seller_id}")
         
-        return credentials
+        return True
     
     def refresh_access_token(self) -> str:
         """
@@ -192,7 +318,7 @@ class AmazonAuthService:
         logger.info(f"Refreshing access token for seller: {self.seller_profile.user.email}")
         
         try:
-            response = requests.post(
+            response = token_refresh_session.post(
                 LWA_TOKEN_URL,
                 data={
                     'grant_type': 'refresh_token',
@@ -204,20 +330,19 @@ class AmazonAuthService:
                 timeout=30
             )
             
-            if response.status_code == 400:
-                error_data = response.json()
-                error = error_data.get('error', '')
-                
-                if error == 'invalid_grant':
-                    raise AmazonTokenExpiredError(
-                        "Refresh token has expired. Please reconnect your Amazon account."
-                    )
-            
             response.raise_for_status()
             data = response.json()
             
-        except AmazonTokenExpiredError:
-            raise
+        except requests.exceptions.HTTPError as e:
+            # Amazon rejected the refresh: stop reporting the connection as healthy
+            self.forget_verified_connection(self.seller_profile)
+            # Throttling and 5xx were already retried by the session
+            if e.response.status_code == 400 and _lwa_error(e.response) == 'invalid_grant':
+                raise AmazonTokenExpiredError(
+                    "Refresh token has expired. Please reconnect your Amazon account."
+                )
+            logger.error(f"Failed to refresh token: {str(e)}")
+            raise AmazonAuthenticationError(f"Failed to refresh token: {str(e)}")
         except requests.exceptions.RequestException as e:
             logger.error(f"Failed to refresh token: {str(e)}")
             raise AmazonAuthenticationError(f"Failed to refresh token: {str(e)}")
@@ -235,6 +360,7 @@ class AmazonAuthService:
             expires_in=expires_in,
             refresh_token=new_refresh_token
         )
+        self._cache_access_token(self.credentials, access_token, expires_in)
         
         # Update seller profile token expiry
         self.seller_profile.amazon_token_expires_at = self.credentials.access_token_expires_at
@@ -257,28 +383,86 @@ class AmazonAuthService:
         if self.credentials.is_access_token_valid:
             return self.credentials.access_token
         
-        return self.refresh_access_token()
+        # Another worker may already have refreshed the token
+        cache_key = self._access_token_cache_key(self.credentials.seller_profile_id)
+        cached_token = self._get_cached_access_token(cache_key)
+        if cached_token:
+            return cached_token
+        
+        lock_key = f"{cache_key}:lock"
+        if not cache.add(lock_key, 1, timeout=REFRESH_LOCK_TIMEOUT):
+            deadline = time.monotonic() + REFRESH_WAIT_SECONDS
+            while time.monotonic() < deadline:
+                time.sleep(0.5)
+                cached_token = self._get_cached_access_token(cache_key)
+                if cached_token:
+                    return cached_token
+            # The other refresh is taking too long; do our own
+        
+        try:
+            return self.refresh_access_token()
+        finally:
+            cache.delete(lock_key)
+    
+    @staticmethod
+    def _access_token_cache_key(seller_profile_id: int) -> str:
+        return f"amazon:access_token:{hash_sensitive_data(str(seller_profile_id))[:32]}"
+    
+    @classmethod
+    def forget_access_token(cls, seller_profile: SellerProfile):
+        """Drop the shared access token of a seller, e.g. once disconnected."""
+        cache.delete(cls._access_token_cache_key(seller_profile.pk))
+    
+    @staticmethod
+    def _get_cached_access_token(cache_key: str) -> Optional[str]:
+        encrypted = cache.get(cache_key)
+        return AmazonCredentials._decrypt(encrypted) if encrypted else None
+    
+    def _cache_access_token(self, credentials: AmazonCredentials, access_token: str, expires_in: int):
+        """Share a fresh access token with the other workers until shortly before it expires."""
+        timeout = expires_in - ACCESS_TOKEN_CACHE_BUFFER
+        if timeout > 0:
+            cache.set(
+                self._access_token_cache_key(credentials.seller_profile_id),
+                AmazonCredentials._encrypt(access_token),
+                timeout=timeout
+            )
     
-    def _fetch_seller_info(self, access_token: str) -> Optional[Dict]:
+    def _fetch_seller_info(self, access_token: str, use_cache: bool = False) -> Optional[Dict]:
         """
         Fetch seller information using the Sellers API.
         
         Args:
             access_token: Valid access token
+            use_cache: Revalidate the last response for this seller with its ETag
             
         Returns:
             Dictionary with seller info or None
         """
+        cache_key = (
+            self._seller_info_cache_key(self.seller_profile.pk)
+            if use_cache and self.seller_profile else None
+        )
+        cached = cache.get(cache_key) if cache_key else None
+        
+        headers = {
+            'x-amz-access-token': access_token,
+            'Content-Type': 'application/json',
+        }
+        if cached and cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        
         try:
-            response = requests.get(
+            response = session.get(
                 f"{SP_API_BASE_URL}/sellers/v1/marketplaceParticipations",
-                headers={
-                    'x-amz-access-token': access_token,
-                    'Content-Type': 'application/json',
-                },
+                headers=headers,
                 timeout=30
             )
             
+            if response.status_code == 304 and cached:
+                cache.touch(cache_key, timeout=SELLER_INFO_CACHE_TIMEOUT)
+                return cached['info']
+            
             if response.status_code != 200:
                 logger.warning(f"Failed to fetch seller info: {response.status_code}")
                 return None
@@ -289,31 +473,35 @@ class AmazonAuthService:
             if not participations:
                 return None
             
-            # Get primary marketplace
-            marketplace_ids = []
-            primary_marketplace = None
-            seller_id = None
+            marketplace_ids = [
+                participation['marketplace']['id']
+                for participation in participations
+                if (participation.get('marketplace') or {}).get('id')
+            ]
+            # First listed marketplace is the primary one
+            primary_marketplace = marketplace_ids[0] if marketplace_ids else None
             
-            for participation in participations:
-                marketplace = participation.get('marketplace', {})
-                mp_id = marketplace.get('id')
-                
-                if mp_id:
-                    marketplace_ids.append(mp_id)
-                    
-                    if not primary_marketplace:
-                        primary_marketplace = mp_id
-                
-                seller = participation.get('participation', {})
-                if not seller_id:
-                    seller_id = seller.get('sellerId')
+            # First participation that carries a seller ID
+            seller_ids = (
+                (participation.get('participation') or {}).get('sellerId')
+                for participation in participations
+            )
+            seller_id = next(filter(None, seller_ids), None)
             
-            return {
+            seller_info = {
                 'seller_id': seller_id,
                 'marketplace_id': primary_marketplace,
                 'marketplace_ids': marketplace_ids,
             }
             
+            if cache_key:
+                cache.set(cache_key, {
+                    'info': seller_info,
+                    'etag': response.headers.get('ETag'),
+                }, timeout=SELLER_INFO_CACHE_TIMEOUT)
+            
+            return seller_info
+            
         except Exception as e:
             logger.error(f"Error fetching seller info: {str(e)}")
             return None
@@ -325,10 +513,41 @@ class AmazonAuthService:
         Returns:
             True if connection is valid
         """
+        cache_key = (
+            self._connection_verified_cache_key(self.seller_profile.pk)
+            if self.seller_profile else None
+        )
+        if cache_key and cache.get(cache_key):
+            return True
+        
         try:
             access_token = self.get_valid_access_token()
-            seller_info = self._fetch_seller_info(access_token)
-            return seller_info is not None
+            seller_info = self._fetch_seller_info(access_token, use_cache=True)
         except Exception as e:
             logger.error(f"Connection verification failed: {str(e)}")
             return False
+        
+        # Only successes are remembered, so a repaired connection shows up at once
+        if seller_info is not None and cache_key:
+            cache.set(cache_key, True, timeout=CONNECTION_VERIFIED_TIMEOUT)
+        
+        return seller_info is not None
+    
+    @staticmethod
+    def _connection_verified_cache_key(seller_profile_id: int) -> str:
+        return f"amazon:connection_verified:{seller_profile_id}"
+    
+    @staticmethod
+    def _seller_info_cache_key(seller_profile_id: int) -> str:
+        return f"amazon:seller_info:{seller_profile_id}"
+    
+    @classmethod
+    def forget_verified_connection(cls, seller_profile: SellerProfile):
+        """
+        Make the next connection check ask Amazon again, e.g. after an auth
+        failure or a disconnect. The cached seller info goes too.
+        """
+        cache.delete_many([
+            cls._connection_verified_cache_key(seller_profile.pk),
+            cls._seller_info_cache_key(seller_profile.pk),
+        ])
@@ -0,0 +1,54 @@
+"""
+Amazon HTTP Sessions
+====================
+Shared requests sessions for LWA and SP-API calls.
+
+Reusing one session keeps connections to api.amazon.com and the SP-API
+regional hosts alive between calls, so token refreshes and API requests
+skip the TCP/TLS handshake. Connections are pooled per host.
+"""
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Connection errors and transient 5xx are retried here; 429 is left to the
+# SP-API client, which honours Retry-After and logs the throttling.
+RETRY_POLICY = Retry(
+    total=3,
+    backoff_factor=0.3,
+    status_forcelist=[500, 502, 503, 504],
+    raise_on_status=False,
+)
+
+# LWA token refreshes have no retry of their own, so token_refresh_session
+# also retries throttled (429) refreshes, waiting for Retry-After. POST is
+# included: refreshing a token is safe to repeat. Exchanging an authorization
+# code is not (codes are single-use), so it goes through `session`, which
+# never re-sends a POST.
+LWA_URL_PREFIX = 'https://api.amazon.com/'
+LWA_RETRY_POLICY = Retry(
+    total=3,
+    backoff_factor=0.3,
+    status_forcelist=[429, 500, 502, 503, 504],
+    allowed_methods=None,
+    respect_retry_after_header=True,
+    raise_on_status=False,
+)
+
+
+def _build_session() -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=RETRY_POLICY)
+    session.mount('https://', adapter)
+    return session
+
+
+def _build_token_refresh_session() -> requests.Session:
+    session = requests.Session()
+    session.mount(LWA_URL_PREFIX, HTTPAdapter(max_retries=LWA_RETRY_POLICY))
+    return session
+
+
+session = _build_session()
+token_refresh_session = _build_token_refresh_session()
@@ -4,16 +4,20 @@ Amazon Reports Service
 Service for requesting, polling, and downloading Amazon reports.
 """
 
-import gzip
 import io
 import logging
 import os
+import random
+import re
 import time
-from datetime import date, datetime
-from typing import List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from itertools import repeat
+from typing import List, Optional, Tuple, Union
 
 import pandas as pd
 from django.conf import settings
+from django.db import connection
 from django.utils import timezone
 
 from apps.accounts.models import SellerProfile
@@ -28,6 +32,12 @@ from utils.helpers import sanitize_filename
 
 logger = logging.getLogger(__name__)
 
+# The multi-threaded PyArrow CSV reader is used for reports when it is installed
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+except ImportError:
+    pa = pa_csv = None
 
 # Report status values from Amazon
 REPORT_STATUS_DONE = 'DONE'
@@ -36,6 +46,85 @@ REPORT_STATUS_CANCELLED = 'CANCELLED'
 REPORT_STATUS_IN_PROGRESS = 'IN_PROGRESS'
 REPORT_STATUS_IN_QUEUE = 'IN_QUEUE'
 
+# Spaces and dashes in report headers become underscores
+_COLUMN_SEPARATOR_RE = re.compile(r'[ \-]')
+
+# Cells read as missing values
+REPORT_NA_VALUES = ['', 'N/A', 'null']
+
+# Dtype of the non-categorical columns, whichever reader parsed the report;
+# missing values are pd.NA
+REPORT_STRING_DTYPE = pd.StringDtype('pyarrow' if pa is not None else 'python')
+
+# Low-cardinality identifier columns (cleaned names), read as categoricals.
+# Everything else is read as string; numbers and dates are converted by the
+# audit engine, which handles the locale-specific formats.
+CATEGORICAL_COLUMNS = frozenset({
+    'sku',
+    'fnsku',
+    'asin',
+    'product_name',
+    'condition',
+    'reason',
+    'disposition',
+    'detailed_disposition',
+    'fulfillment_center_id',
+    'currency',
+    'sales_channel',
+    'ship_country',
+})
+
+# First wait between report status checks; grows towards poll_interval
+INITIAL_POLL_DELAY = 5
+
+# Reports requested/polled/downloaded in parallel; kept low for the API rate limits
+DOWNLOAD_WORKERS = 4
+
+
+def _clean_column_name(name) -> str:
+    return _COLUMN_SEPARATOR_RE.sub('_', str(name).strip().lower())
+
+
+def _read_report_with_pyarrow(source, raw_columns, categorical, compression) -> pd.DataFrame:
+    """
+    Read a report with the PyArrow CSV reader.
+    
+    Column types are given up front so values are never inferred (SKUs keep
+    their leading zeros); categoricals are dictionary-encoded while parsing.
+    """
+    table = pa_csv.read_csv(
+        pa.input_stream(source, compression=compression),
+        parse_options=pa_csv.ParseOptions(delimiter='\t'),
+        convert_options=pa_csv.ConvertOptions(
+            column_types={
+                c: pa.dictionary(pa.int32(), pa.string()) if c in categorical else pa.string()
+                for c in raw_columns
+            },
+            null_values=REPORT_NA_VALUES,
+            strings_can_be_null=True,
+        ),
+    )
+    return table.to_pandas(types_mapper={pa.string(): REPORT_STRING_DTYPE}.get)
+
+
+def _read_report_with_pandas(source, raw_columns, categorical, compression) -> pd.DataFrame:
+    """
+    Read a report with the pandas C parser.
+    
+    Produces the same dtypes and missing values as the PyArrow reader, and
+    also accepts rows with fewer fields than the header.
+    """
+    return pd.read_csv(
+        source,
+        sep='\t',
+        encoding='utf-8',
+        dtype={c: 'category' if c in categorical else REPORT_STRING_DTYPE for c in raw_columns},
+        na_values=REPORT_NA_VALUES,
+        keep_default_na=False,
+        compression=compression,
+        low_memory=False,
+    )
+
 
 class ReportsService:
     """
@@ -82,13 +171,8 @@ class ReportsService:
             raise DataProcessingError("No marketplaces configured", step="request_report")
         
         # Create database record
-        report_request = ReportRequest.objects.create(
-            seller_profile=self.seller_profile,
-            report_type=report_type,
-            marketplace_ids=marketplaces,
-            data_start_date=start_date,
-            data_end_date=end_date,
-        )
+        report_request = self._build_report_request(report_type, start_date, end_date, marketplaces)
+        report_request.save()
         
         logger.info(
             f"Requesting report {report_type} for {self.seller_profile.user.email} "
@@ -96,26 +180,7 @@ class ReportsService:
         )
         
         try:
-            # Format dates for Amazon API
-            start_time = datetime.combine(start_date, datetime.min.time()).isoformat() + 'Z'
-            end_time = datetime.combine(end_date, datetime.max.time()).isoformat() + 'Z'
-            
-            # Request report from Amazon
-            response = self.client.create_report(
-                report_type=report_type,
-                marketplace_ids=marketplaces,
-                data_start_time=start_time,
-                data_end_time=end_time,
-            )
-            
-            report_id = response.get('reportId')
-            
-            if not report_id:
-                raise DataProcessingError(
-                    "No report ID in Amazon response",
-                    step="request_report"
-                )
-            
+            report_id = self._submit_report(report_request)
             report_request.mark_processing(report_id)
             logger.info(f"Report requested successfully. Amazon report ID: {report_id}")
             
@@ -126,6 +191,54 @@ class ReportsService:
             report_request.mark_failed(str(e))
             raise
     
+    def _build_report_request(
+        self,
+        report_type: str,
+        start_date: date,
+        end_date: date,
+        marketplaces: List[str]
+    ) -> ReportRequest:
+        """Build an unsaved ReportRequest for this seller."""
+        return ReportRequest(
+            seller_profile=self.seller_profile,
+            report_type=report_type,
+            marketplace_ids=marketplaces,
+            data_start_date=start_date,
+            data_end_date=end_date,
+        )
+    
+    def _submit_report(self, report_request: ReportRequest) -> str:
+        """
+        Ask Amazon to generate a report.
+        
+        Args:
+            report_request: ReportRequest describing the report
+            
+        Returns:
+            Amazon report ID
+        """
+        # Format dates for Amazon API (whole days, UTC)
+        start_time = f"{report_request.data_start_date.isoformat()}T00:00:00Z"
+        end_time = f"{report_request.data_end_date.isoformat()}T23:59:59Z"
+        
+        # Request report from Amazon
+        response = self.client.create_report(
+            report_type=report_request.report_type,
+            marketplace_ids=report_request.marketplace_ids,
+            data_start_time=start_time,
+            data_end_time=end_time,
+        )
+        
+        report_id = response.get('reportId')
+        
+        if not report_id:
+            raise DataProcessingError(
+                "No report ID in Amazon response",
+                step="request_report"
+            )
+        
+        return report_id
+    
     def check_report_status(self, report_request: ReportRequest) -> str:
         """
         Check the status of a report request.
@@ -175,7 +288,7 @@ class ReportsService:
         Args:
             report_request: ReportRequest to wait for
             max_wait_seconds: Maximum time to wait
-            poll_interval: Seconds between status checks
+            poll_interval: Maximum seconds between status checks
             
         Returns:
             Updated ReportRequest
@@ -184,9 +297,10 @@ class ReportsService:
             AmazonReportNotReadyError: If report doesn't complete in time
             AmazonReportFailedError: If report fails
         """
-        start_time = time.time()
+        deadline = time.monotonic() + max_wait_seconds
+        delay = INITIAL_POLL_DELAY
         
-        while time.time() - start_time < max_wait_seconds:
+        while time.monotonic() < deadline:
             status = self.check_report_status(report_request)
             
             if status == REPORT_STATUS_DONE:
@@ -199,8 +313,11 @@ class ReportsService:
                     f"Report ended with status: {status}"
                 )
             
-            logger.debug(f"Report not ready, waiting {poll_interval}s...")
-            time.sleep(poll_interval)
+            # Poll soon after the request, then back off (with jitter) up to poll_interval
+            wait = min(delay, max(deadline - time.monotonic(), 0))
+            logger.debug(f"Report not ready, waiting {wait:.1f}s...")
+            time.sleep(wait)
+            delay = min(poll_interval, delay * 1.7 + random.uniform(0, 1))
         
         raise AmazonReportNotReadyError(
             report_request.report_id,
@@ -211,12 +328,23 @@ class ReportsService:
         """
         Download a completed report and parse it.
         
+        A report document never changes, so a report that was already
+        downloaded is parsed again from its saved file.
+        
         Args:
             report_request: Completed ReportRequest
             
         Returns:
             Tuple of (file_path, DataFrame)
         """
+        if self._has_saved_document(report_request):
+            logger.info(f"Reusing downloaded report file: {report_request.file_path}")
+            df = self._parse_report_content(
+                report_request.file_path,
+                compression='gzip' if report_request.file_path.endswith('.gz') else None
+            )
+            return report_request.file_path, df
+        
         if report_request.status != ReportRequest.ReportStatus.DONE:
             raise DataProcessingError(
                 f"Cannot download report with status: {report_request.status}",
@@ -244,27 +372,26 @@ class ReportsService:
                     step="download_report"
                 )
             
-            # Download content
-            content = self.client.download_document(download_url)
-            
-            # Decompress if needed
-            if compression == 'GZIP':
-                content = gzip.decompress(content)
-            
-            # Save to file
+            # GZIP documents are stored as downloaded; pandas decompresses while parsing
+            gzipped = compression == 'GZIP'
             filename = sanitize_filename(
                 f"{report_request.report_type}_{report_request.data_start_date}_"
-                f"{report_request.data_end_date}_{report_request.report_id}.tsv"
+                f"{report_request.data_end_date}_{report_request.report_id}"
+                f"{'.tsv.gz' if gzipped else '.tsv'}"
             )
             file_path = os.path.join(self.reports_dir, filename)
             
-            with open(file_path, 'wb') as f:
-                f.write(content)
-            
-            file_size = len(content)
+            # Stream the raw content straight to disk; the file only appears
+            # under its final name once complete
+            partial_path = f"{file_path}.part"
+            with open(partial_path, 'wb') as f:
+                file_size = self.client.stream_document(download_url, f)
+            os.replace(partial_path, file_path)
             
-            # Parse to DataFrame
-            df = self._parse_report_content(content)
+            # Parse to DataFrame from the saved file
+            df = self._parse_report_content(
+                file_path, compression='gzip' if gzipped else None
+            )
             row_count = len(df)
             
             # Update report request
@@ -281,29 +408,60 @@ class ReportsService:
             report_request.mark_failed(f"Download failed: {str(e)}")
             raise
     
-    def _parse_report_content(self, content: bytes) -> pd.DataFrame:
+    @staticmethod
+    def _has_saved_document(report_request: ReportRequest) -> bool:
+        """Whether the report's document was already downloaded and is still on disk."""
+        return (
+            report_request.status == ReportRequest.ReportStatus.DOWNLOADED
+            and bool(report_request.file_path)
+            and os.path.isfile(report_request.file_path)
+            and os.path.getsize(report_request.file_path) > 0
+        )
+    
+    def _parse_report_content(
+        self,
+        content: Union[bytes, str],
+        compression: Optional[str] = None
+    ) -> pd.DataFrame:
         """
         Parse report content into a Pandas DataFrame.
         
         Args:
-            content: Raw report content (TSV format)
+            content: Raw report content (TSV format), or the path of a saved report
+            compression: Compression of the content, e.g. 'gzip'
             
         Returns:
             Parsed DataFrame
         """
+        source = io.BytesIO(content) if isinstance(content, bytes) else content
+        
         try:
-            # Amazon reports are tab-separated
-            df = pd.read_csv(
-                io.BytesIO(content),
-                sep='\t',
-                encoding='utf-8',
-                dtype=str,  # Read everything as string initially
-                na_values=['', 'N/A', 'null'],
-                low_memory=False,
-            )
+            # Amazon reports are tab-separated; the header decides the column types
+            raw_columns = list(pd.read_csv(
+                source, sep='\t', encoding='utf-8', nrows=0, compression=compression
+            ).columns)
+            if isinstance(source, io.BytesIO):
+                source.seek(0)
+            
+            columns = [_clean_column_name(c) for c in raw_columns]
+            categorical = {
+                raw for raw, column in zip(raw_columns, columns)
+                if column in CATEGORICAL_COLUMNS
+            }
+            
+            df = None
+            if pa_csv is not None:
+                try:
+                    df = _read_report_with_pyarrow(source, raw_columns, categorical, compression)
+                except pa.ArrowInvalid as e:
+                    # e.g. rows shorter than the header, which pandas pads with missing values
+                    logger.warning(f"PyArrow could not parse the report, using pandas: {str(e)}")
+                    if isinstance(source, io.BytesIO):
+                        source.seek(0)
+            if df is None:
+                df = _read_report_with_pandas(source, raw_columns, categorical, compression)
             
-            # Clean column names
-            df.columns = df.columns.str.strip().str.lower().str.replace(' ', '_').str.replace('-', '_')
+            df.columns = columns
             
             return df
             
@@ -336,54 +494,120 @@ class ReportsService:
             ReportRequest.ReportType.FBA_INVENTORY_ADJUSTMENTS,
         ]
         
-        requests = []
+        if not self.marketplace_ids:
+            logger.error("Cannot request audit reports: no marketplaces configured")
+            return []
         
-        for report_type in report_types:
-            try:
-                report_request = self.request_report(
-                    report_type=report_type,
-                    start_date=start_date,
-                    end_date=end_date,
-                )
-                requests.append(report_request)
-                
-                # Small delay between requests to avoid throttling
-                time.sleep(1)
-                
-            except Exception as e:
-                logger.error(f"Failed to request {report_type}: {str(e)}")
-                # Continue with other reports
-                continue
+        # One INSERT for every report record
+        report_requests = ReportRequest.objects.bulk_create([
+            self._build_report_request(report_type, start_date, end_date, self.marketplace_ids)
+            for report_type in report_types
+        ])
+        
+        logger.info(
+            f"Requesting {len(report_requests)} reports for {self.seller_profile.user.email} "
+            f"from {start_date} to {end_date}"
+        )
+        
+        if not self.client.simulation_mode:
+            self.client.auth_service.get_valid_access_token()
+        
+        # The six createReport calls fit in the Reports API burst; send them together
+        with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as executor:
+            outcomes = list(executor.map(self._submit_report_in_worker, report_requests))
         
-        logger.info(f"Requested {len(requests)} reports for audit")
-        return requests
+        now = timezone.now()
+        requested = []
+        for report_request, (report_id, error) in zip(report_requests, outcomes):
+            report_request.updated_at = now
+            if error is None:
+                report_request.report_id = report_id
+                report_request.status = ReportRequest.ReportStatus.PROCESSING
+                requested.append(report_request)
+            else:
+                logger.error(f"Failed to request {report_request.report_type}: {error}")
+                report_request.status = ReportRequest.ReportStatus.FAILED
+                report_request.error_message = error
+        
+        ReportRequest.objects.bulk_update(
+            report_requests, ['report_id', 'status', 'error_message', 'updated_at']
+        )
+        
+        logger.info(f"Requested {len(requested)} reports for audit")
+        return requested
+    
+    def _submit_report_in_worker(self, report_request: ReportRequest) -> Tuple[Optional[str], Optional[str]]:
+        """Submit one report from a worker thread; returns (report_id, error)."""
+        try:
+            return self._submit_report(report_request), None
+        except Exception as e:
+            return None, str(e)
+        finally:
+            connection.close()
     
     def download_all_ready_reports(
         self,
-        report_requests: List[ReportRequest]
+        report_requests: List[ReportRequest],
+        max_wait_seconds: int = 0
     ) -> dict:
         """
         Download all ready reports.
         
         Args:
             report_requests: List of ReportRequest objects
+            max_wait_seconds: How long to wait for each report to be ready;
+                0 only downloads the reports that are ready now
             
         Returns:
             Dictionary of report_type -> DataFrame
         """
-        results = {}
+        if not report_requests:
+            return {}
         
-        for report_request in report_requests:
-            # Check/update status
-            status = self.check_report_status(report_request)
+        # Refresh the access token once up front so the workers don't race to do it
+        if not self.client.simulation_mode:
+            self.client.auth_service.get_valid_access_token()
+        
+        # The work is network-bound: poll and download the reports concurrently
+        with ThreadPoolExecutor(max_workers=min(DOWNLOAD_WORKERS, len(report_requests))) as executor:
+            frames = list(executor.map(
+                self._fetch_ready_report, report_requests, repeat(max_wait_seconds)
+            ))
+        
+        return {
+            report_request.report_type: df
+            for report_request, df in zip(report_requests, frames)
+            if df is not None
+        }
+    
+    def _fetch_ready_report(
+        self,
+        report_request: ReportRequest,
+        max_wait_seconds: int = 0
+    ) -> Optional[pd.DataFrame]:
+        """
+        Wait for one report and download it once ready. Runs in a worker thread.
+        
+        Args:
+            report_request: ReportRequest to check
+            max_wait_seconds: How long to wait for the report; 0 checks it once
             
-            if status == REPORT_STATUS_DONE:
-                try:
-                    file_path, df = self.download_report(report_request)
-                    results[report_request.report_type] = df
-                except Exception as e:
-                    logger.error(
-                        f"Failed to download {report_request.report_type}: {str(e)}"
-                    )
-        
-        return results
+        Returns:
+            Parsed DataFrame, or None if the report is not ready or failed to download
+        """
+        try:
+            if max_wait_seconds:
+                self.wait_for_report(report_request, max_wait_seconds=max_wait_seconds)
+            elif self.check_report_status(report_request) != REPORT_STATUS_DONE:
+                return None
+            
+            file_path, df = self.download_report(report_request)
+            return df
+        except Exception as e:
+            logger.error(
+                f"Failed to get report {report_request.report_type}: {str(e)}"
+            )
+            return None
+        finally:
+            # Each worker thread opens its own database connection
+            connection.close()
@@ -5,17 +5,28 @@ Main client for interacting with Amazon SP-API.
 Includes automatic retry with exponential backoff for rate limiting (429 errors).
 """
 
+import json
 import logging
+import random
+import tempfile
 import time
-from typing import Any, Dict, Optional
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
 from functools import wraps
+from types import MappingProxyType
 
 import requests
 from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
 from django.utils import timezone
 
 from apps.accounts.models import SellerProfile
 from apps.amazon_integration.models import AmazonCredentials, APIRequestLog
+from apps.amazon_integration.services.http import session
 from apps.amazon_integration.services.auth_service import AmazonAuthService
 from utils.exceptions import (
     AmazonAPIException,
@@ -25,16 +36,40 @@ from utils.exceptions import (
 
 logger = logging.getLogger(__name__)
 
+# SP-API payloads are parsed and serialized by orjson when it is installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _loads_json(content: bytes) -> Any:
+    return orjson.loads(content) if orjson else json.loads(content)
+
+
+def _dumps_json(obj: Any) -> bytes:
+    return orjson.dumps(obj) if orjson else json.dumps(obj).encode('utf-8')
+
 
 # SP-API Regional endpoints
-SP_API_ENDPOINTS = {
+SP_API_ENDPOINTS = MappingProxyType({
     'NA': 'https://sellingpartnerapi-na.amazon.com',  # North America
     'EU': 'https://sellingpartnerapi-eu.amazon.com',  # Europe
     'FE': 'https://sellingpartnerapi-fe.amazon.com',  # Far East
-}
+})
+DEFAULT_REGION = 'EU'
+
+# Streamed document downloads are read in chunks of this size
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# download_document keeps documents up to this size in memory
+DOCUMENT_SPOOL_MAX_SIZE = 10 * 1024 * 1024
+
+# Concurrent requests made by batch_get; kept low for the API rate limits
+DEFAULT_MAX_CONCURRENCY = 4
 
 # Marketplace to region mapping
-MARKETPLACE_REGIONS = {
+MARKETPLACE_REGIONS = MappingProxyType({
     # Europe
     'A1PA6795UKMFR9': 'EU',   # Germany
     'A1RKKUPIHCS9HS': 'EU',   # Spain
@@ -54,12 +89,118 @@ MARKETPLACE_REGIONS = {
     # Far East
     'A1VC38T7YXB528': 'FE',   # Japan
     'A39IBJ37TRP1C6': 'FE',   # Australia
-}
+})
+
+
+# =============================================================================
+# SIMULATION MODE RESPONSES
+# =============================================================================
+
+# Delay added to every simulated SP-API call
+SIMULATED_LATENCY = 0.5
+
+
+def _mock_create_report(endpoint: str) -> Dict:
+    return {'reportId': f"sim-report-{uuid.uuid4().hex[:10]}"}
+
+
+def _mock_report_document(endpoint: str) -> Dict:
+    return {
+        'reportDocumentId': endpoint.split('/')[-1],
+        'url': f"https://mock-amazon.com/download/{uuid.uuid4().hex}",
+        'compressionAlgorithm': None
+    }
+
+
+def _mock_report_status(endpoint: str) -> Dict:
+    return {
+        'reportId': endpoint.split('/')[-1],
+        'processingStatus': 'DONE',
+        'reportDocumentId': f"sim-doc-{uuid.uuid4().hex[:10]}"
+    }
+
+
+def _mock_inventory_summaries(endpoint: str) -> Dict:
+    return {
+        'payload': {
+            'inventorySummaries': [
+                {
+                    'asin': f'B00{i}FAKE',
+                    'fnSku': f'X00{i}FAKE',
+                    'sellerSku': f'SKU-{i}-FAKE',
+                    'condition': 'NewItem',
+                    'inventoryDetails': {
+                        'fulfillableQuantity': random.randint(0, 100),
+                        'inboundWorkingQuantity': random.randint(0, 20),
+                        'inboundShippedQuantity': random.randint(0, 20),
+                        'inboundReceivingQuantity': random.randint(0, 20),
+                        'reservedQuantity': {
+                            'totalReservedQuantity': random.randint(0, 10),
+                            'pendingCustomerOrderQuantity': random.randint(0, 5),
+                            'pendingTransshipmentQuantity': random.randint(0, 5),
+                            'fcProcessingQuantity': random.randint(0, 2),
+                        }
+                    }
+                } for i in range(5)
+            ]
+        }
+    }
+
+
+# (matches(endpoint, data), handler) pairs, checked in order; the reports
+# calls made while polling come first. Documents are matched before report
+# status, whose check would also match them.
+_MOCK_ROUTES = (
+    (lambda endpoint, data: '/documents/' in endpoint, _mock_report_document),
+    (
+        lambda endpoint, data: '/reports/' in endpoint and not endpoint.endswith('/reports'),
+        _mock_report_status,
+    ),
+    (
+        lambda endpoint, data: endpoint.endswith('/reports') and bool(data) and 'reportType' in data,
+        _mock_create_report,
+    ),
+    (lambda endpoint, data: '/fba/inventory/v1/summaries' in endpoint, _mock_inventory_summaries),
+)
+
+
+# Generic FBA Inventory/Event style TSV returned for simulated documents
+_MOCK_REPORT_HEADER = "\t".join((
+    "start-date", "end-date", "dates", "transaction-type", "payment-type", "detail", "amount", "quantity", "product-title",
+    "sku", "fnsku", "asin", "reason", "status", "condition", "currency-code", "fulfillment-center-id", "disposition",
+    "adjusted-date", "approval-date", "shipment-date", "return-date", "shipment-id",
+))
+_MOCK_REPORT_ROW_FORMAT = (
+    "{date}\t{date}\t{date}\t{transaction_type}\tProduct charges\tPayment\t{amount:.2f}\t{quantity}\t"
+    "Product {i}\tSKU-{i}\tFNSKU-{i}\tASIN-{i}\tD\tUnsellable\tCustomerDamaged\tEUR\tCDG1\tSELLABLE\t"
+    "{date}\t{date}\t{date}\t{date}\tFBA{i:08d}"
+)
+
+
+# Shortest wait before retrying a throttled request
+MIN_RETRY_DELAY = 0.5
+
+
+def _shared_throttle_wait(seller_profile_id: Optional[int], wait_time: float) -> float:
+    """
+    Extend a throttle wait to the seller's shared backoff and record it.
+    
+    Throttling applies to the selling partner, so every worker calling the
+    API for the same seller waits until the latest deadline any of them set.
+    """
+    if seller_profile_id is None:
+        return wait_time
+    
+    cache_key = f"sp_api:throttled_until:{seller_profile_id}"
+    now = time.time()
+    wait_time = max(wait_time, (cache.get(cache_key) or 0) - now)
+    cache.set(cache_key, now + wait_time, timeout=int(wait_time) + 1)
+    return wait_time
 
 
 def with_retry(max_retries: int = 5, base_delay: float = 2.0, max_delay: float = 120.0):
     """
-    Decorator for automatic retry with exponential backoff.
+    Decorator for automatic retry with jittered exponential backoff.
     Implements Amazon's recommended throttling handling.
     
     Args:
@@ -81,9 +222,17 @@ def with_retry(max_retries: int = 5, base_delay: float = 2.0, max_delay: float =
                     last_exception = e
                     
                     if attempt < max_retries:
-                        # Use Retry-After header if available, otherwise exponential backoff
-                        wait_time = e.retry_after if e.retry_after else delay
-                        wait_time = min(wait_time, max_delay)
+                        # Use Retry-After header if available, otherwise exponential
+                        # backoff with full jitter so throttled workers don't retry in step
+                        if e.retry_after:
+                            wait_time = min(e.retry_after, max_delay)
+                        else:
+                            wait_time = random.uniform(MIN_RETRY_DELAY, min(delay, max_delay))
+                        
+                        seller_profile = getattr(args[0], 'seller_profile', None) if args else None
+                        wait_time = _shared_throttle_wait(
+                            seller_profile.pk if seller_profile else None, wait_time
+                        )
                         
                         logger.warning(
                             f"Rate limited (attempt {attempt + 1}/{max_retries + 1}). "
@@ -122,20 +271,19 @@ class SPAPIClient:
         self.seller_profile = seller_profile
         self.auth_service = AmazonAuthService(seller_profile)
         
-        # Determine region from marketplace
-        marketplace_ids = seller_profile.amazon_marketplace_ids or []
-        self.region = 'EU'  # Default to Europe
-        
-        if marketplace_ids:
-            first_marketplace = marketplace_ids[0]
-            self.region = MARKETPLACE_REGIONS.get(first_marketplace, 'EU')
-        
+        # Determine region from the first marketplace (default to Europe)
+        marketplace_ids = seller_profile.amazon_marketplace_ids
+        self.region = (
+            MARKETPLACE_REGIONS.get(marketplace_ids[0], DEFAULT_REGION)
+            if marketplace_ids else DEFAULT_REGION
+        )
         self.base_url = SP_API_ENDPOINTS[self.region]
         
         # Check for simulation mode or placeholder credentials
         sp_api_settings = getattr(settings, 'AMAZON_SP_API_SETTINGS', {})
         app_id = sp_api_settings.get('lwa_app_id', '')
         self.simulation_mode = getattr(settings, 'AMAZON_SIMULATION_MODE', False) or 'replace-me' in app_id
+        self.max_concurrency = sp_api_settings.get('max_concurrency', DEFAULT_MAX_CONCURRENCY)
         
         if self.simulation_mode:
             logger.warning("SP-API Client running in SIMULATION MODE. No real requests will be made.")
@@ -193,13 +341,16 @@ class SPAPIClient:
             if log_entry:
                 log_entry.mark_failed(response.status_code, "Authentication failed")
             
+            AmazonAuthService.forget_verified_connection(self.seller_profile)
+            
             raise AmazonAuthenticationError(
                 f"Authentication failed with status {response.status_code}"
             )
         
         # Other errors
         if not response.ok:
-            error_body = response.text[:500] if response.text else "No error details"
+            # Only the logged prefix of the body is decoded
+            error_body = response.content[:500].decode('utf-8', errors='replace') or "No error details"
             
             if log_entry:
                 log_entry.mark_failed(response.status_code, error_body)
@@ -211,10 +362,13 @@ class SPAPIClient:
         
         # Success
         if log_entry:
-            log_entry.mark_success(response.status_code, response.text[:1000])
+            log_entry.mark_success(
+                response.status_code,
+                response.content[:1000].decode('utf-8', errors='replace')
+            )
         
         try:
-            return response.json()
+            return _loads_json(response.content)
         except ValueError:
             return {'raw_response': response.text}
     
@@ -225,7 +379,8 @@ class SPAPIClient:
         params: Dict = None
     ) -> APIRequestLog:
         """
-        Create an API request log entry.
+        Build an API request log entry. It is kept in memory and queued for
+        a batched write once the request has finished (see log_buffer).
         
         Args:
             endpoint: API endpoint
@@ -233,9 +388,9 @@ class SPAPIClient:
             params: Request parameters
             
         Returns:
-            APIRequestLog instance
+            Unsaved APIRequestLog instance
         """
-        return APIRequestLog.objects.create(
+        return APIRequestLog(
             seller_profile=self.seller_profile,
             endpoint=endpoint,
             method=method,
@@ -263,10 +418,11 @@ class SPAPIClient:
             
         if self.simulation_mode:
             logger.info(f"SIMULATION GET {endpoint}")
+            log_entry.queue()
             return self._mock_response(endpoint, params=params)
         
         try:
-            response = requests.get(
+            response = session.get(
                 url,
                 headers=self._get_headers(),
                 params=params or {},
@@ -282,6 +438,43 @@ class SPAPIClient:
         except requests.exceptions.RequestException as e:
             log_entry.mark_failed(error_message=str(e))
             raise AmazonAPIException(f"Request failed: {str(e)}", code="REQUEST_ERROR")
+        
+        finally:
+            # Entries not finalized by a mark_* call are still written as pending
+            log_entry.queue()
+    
+    def batch_get(self, calls: List[Tuple[str, Optional[Dict]]]) -> List[Dict]:
+        """
+        Make independent GET requests concurrently.
+        
+        Each call is retried on throttling like get(); at most
+        `max_concurrency` requests are in flight at once.
+        
+        Args:
+            calls: List of (endpoint, params) tuples
+            
+        Returns:
+            JSON responses, in the order of `calls`
+            
+        Raises:
+            The first exception raised by a call, in the order of `calls`
+        """
+        if not calls:
+            return []
+        
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(calls))) as executor:
+            futures = [
+                executor.submit(self._get_in_worker, endpoint, params)
+                for endpoint, params in calls
+            ]
+            return [future.result() for future in futures]
+    
+    def _get_in_worker(self, endpoint: str, params: Optional[Dict]) -> Dict:
+        """Make a GET request from a worker thread."""
+        try:
+            return self.get(endpoint, params)
+        finally:
+            connection.close()
     
     @with_retry(max_retries=5, base_delay=2.0)
     def post(self, endpoint: str, data: Dict = None, params: Dict = None) -> Dict:
@@ -305,13 +498,14 @@ class SPAPIClient:
             
         if self.simulation_mode:
             logger.info(f"SIMULATION POST {endpoint}")
+            log_entry.queue()
             return self._mock_response(endpoint, params=params, data=data)
         
         try:
-            response = requests.post(
+            response = session.post(
                 url,
                 headers=self._get_headers(),
-                json=data or {},
+                data=_dumps_json(data or {}),
                 params=params or {},
                 timeout=60
             )
@@ -325,72 +519,60 @@ class SPAPIClient:
         except requests.exceptions.RequestException as e:
             log_entry.mark_failed(error_message=str(e))
             raise AmazonAPIException(f"Request failed: {str(e)}", code="REQUEST_ERROR")
+        
+        finally:
+            # Entries not finalized by a mark_* call are still written as pending
+            log_entry.queue()
     
     def _mock_response(self, endpoint: str, params: Dict = None, data: Dict = None) -> Dict:
         """Generate mock responses for simulation mode."""
-        import random
-        import uuid
-        from datetime import datetime, timedelta
-        
         # Simulate network delay
-        time.sleep(0.5)
-        
-        # ... (rest of the mock implementation - see below)
+        time.sleep(SIMULATED_LATENCY)
         
-        # Reports API - Create
-        if endpoint.endswith('/reports') and data and 'reportType' in data:
-            return {'reportId': f"sim-report-{uuid.uuid4().hex[:10]}"}
+        for matches, handler in _MOCK_ROUTES:
+            if matches(endpoint, data):
+                return handler(endpoint)
         
-        # Documents API (check BEFORE reports status to avoid false match)
-        if '/documents/' in endpoint:
-            return {
-                'reportDocumentId': endpoint.split('/')[-1],
-                'url': f"https://mock-amazon.com/download/{uuid.uuid4().hex}",
-                'compressionAlgorithm': None
-            }
-            
-        # Reports API - Get Status
-        if '/reports/' in endpoint and not endpoint.endswith('/reports'):
-            report_id = endpoint.split('/')[-1]
-            return {
-                'reportId': report_id,
-                'processingStatus': 'DONE', 
-                'reportDocumentId': f"sim-doc-{uuid.uuid4().hex[:10]}"
-            }
-            
-        # Inventory API
-        if '/fba/inventory/v1/summaries' in endpoint:
-            return {
-                'payload': {
-                    'inventorySummaries': [
-                        {
-                            'asin': f'B00{i}FAKE',
-                            'fnSku': f'X00{i}FAKE',
-                            'sellerSku': f'SKU-{i}-FAKE',
-                            'condition': 'NewItem',
-                            'inventoryDetails': {
-                                'fulfillableQuantity': random.randint(0, 100),
-                                'inboundWorkingQuantity': random.randint(0, 20),
-                                'inboundShippedQuantity': random.randint(0, 20),
-                                'inboundReceivingQuantity': random.randint(0, 20),
-                                'reservedQuantity': {
-                                    'totalReservedQuantity': random.randint(0, 10),
-                                    'pendingCustomerOrderQuantity': random.randint(0, 5),
-                                    'pendingTransshipmentQuantity': random.randint(0, 5),
-                                    'fcProcessingQuantity': random.randint(0, 2),
-                                }
-                            }
-                        } for i in range(5)
-                    ]
-                }
-            }
-            
         return {}
 
-    def download_document(self, url: str) -> bytes:
+    def download_document(self, url: str, gzipped: bool = False) -> BinaryIO:
         """
         Download a document (report) from a pre-signed URL.
         Handles simulation mode for mock URLs.
+        
+        The content is spooled in memory up to DOCUMENT_SPOOL_MAX_SIZE and
+        then spills to a temporary file.
+        
+        Args:
+            url: Pre-signed document URL
+            gzipped: Whether the document is GZIP-compressed
+            
+        Returns:
+            Temporary file holding the (decompressed) content, positioned at the start
+        """
+        document = tempfile.SpooledTemporaryFile(max_size=DOCUMENT_SPOOL_MAX_SIZE)
+        try:
+            self.stream_document(url, document, gzipped=gzipped)
+        except Exception:
+            document.close()
+            raise
+        
+        document.seek(0)
+        return document
+
+    def stream_document(self, url: str, file_obj: BinaryIO, gzipped: bool = False) -> int:
+        """
+        Stream a document (report) from a pre-signed URL into a file,
+        decompressing GZIP content on the fly. Memory use stays at one
+        chunk whatever the size of the report.
+        
+        Args:
+            url: Pre-signed document URL
+            file_obj: Binary file object to write the (decompressed) content to
+            gzipped: Whether the document is GZIP-compressed
+            
+        Returns:
+            Number of bytes written
         """
         # Simulation Mode
         if getattr(settings, 'AMAZON_SIMULATION_MODE', False):
@@ -398,54 +580,51 @@ class SPAPIClient:
 
         if self.simulation_mode and "mock-amazon.com" in url:
             logger.info("Generating mock report content for simulation")
-            return self._generate_mock_report_content()
+            return file_obj.write(self._generate_mock_report_content())
 
         log_entry = self._create_log_entry(url[:100], 'GET', {'type': 'document_download'})
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if gzipped else None
+        written = 0
         
         try:
-            response = requests.get(url, timeout=300)  # 5 minute timeout for large files
-            response.raise_for_status()
-            
-            log_entry.mark_success(response.status_code, f"Downloaded {len(response.content)} bytes")
-            
-            return response.content
-            
-        except requests.exceptions.RequestException as e:
+            with session.get(url, stream=True, timeout=300) as response:
+                response.raise_for_status()
+                
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    if decompressor:
+                        chunk = decompressor.decompress(chunk)
+                    written += file_obj.write(chunk)
+                
+                if decompressor:
+                    written += file_obj.write(decompressor.flush())
+                
+                log_entry.mark_success(response.status_code, f"Downloaded {written} bytes")
+            
+            return written
+            
+        except (requests.exceptions.RequestException, zlib.error) as e:
             log_entry.mark_failed(error_message=str(e))
             raise AmazonAPIException(f"Failed to download document: {str(e)}")
+        
+        finally:
+            log_entry.queue()
 
     def _generate_mock_report_content(self) -> bytes:
         """Generate fake TSV content for reports."""
-        import random
-        from datetime import datetime, timedelta
-        
         # Determine report type based on context (simplified for now, generic content)
         # In a real scenario we'd track what report type corresponds to the document ID
-        
-        # Generating a generic FBA Inventory/Event style TSV
-        headers = [
-            "start-date", "end-date", "dates", "transaction-type", "payment-type", "detail", "amount", "quantity", "product-title",
-            "sku", "fnsku", "asin", "reason", "status", "condition", "currency-code", "fulfillment-center-id", "disposition",
-            "adjusted-date", "approval-date", "shipment-date", "return-date", "shipment-id"
-        ]
-        
-        lines = ["\t".join(headers)]
-        
-        for i in range(20):
-            date_str = (datetime.now() - timedelta(days=random.randint(0, 30))).isoformat()
-            lines.append("\t".join([
-                date_str, date_str, date_str, 
-                random.choice(["Order", "Refund", "Adjustment"]), 
-                "Product charges", 
-                "Payment", 
-                str(random.uniform(10.0, 100.0)), 
-                str(random.randint(1, 5)), 
-                f"Product {i}",
-                f"SKU-{i}", f"FNSKU-{i}", f"ASIN-{i}",
-                "D", "Unsellable", "CustomerDamaged", "EUR", "CDG1", "SELLABLE"
-            ]))
-            
-        return "\n".join(lines).encode('utf-8')
+        now = datetime.now()
+        rows = "\n".join(
+            _MOCK_REPORT_ROW_FORMAT.format(
+                i=i,
+                date=(now - timedelta(days=random.randint(0, 30))).isoformat(),
+                transaction_type=random.choice(("Order", "Refund", "Adjustment")),
+                amount=random.uniform(10.0, 100.0),
+                quantity=random.randint(1, 5),
+            )
+            for i in range(20)
+        )
+        return f"{_MOCK_REPORT_HEADER}\n{rows}".encode('utf-8')
 
     # ... (rest of existing methods from get_marketplace_participations down)
     
@@ -0,0 +1,24 @@
+"""
+Amazon Integration Signals
+==========================
+Signal handlers for the Amazon integration app.
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from apps.amazon_integration.models import AmazonCredentials
+from apps.amazon_integration.services.auth_service import AmazonAuthService
+
+
+@receiver(post_delete, sender=AmazonCredentials)
+def forget_cached_connection(sender, instance, **kwargs):
+    """Drop the cached access token and connection check of deleted credentials."""
+    seller_profile = instance.seller_profile
+    
+    def forget():
+        AmazonAuthService.forget_access_token(seller_profile)
+        AmazonAuthService.forget_verified_connection(seller_profile)
+    
+    transaction.on_commit(forget)
@@ -0,0 +1,114 @@
+"""
+Amazon Integration Celery Tasks
+===============================
+Asynchronous tasks for the Amazon SP-API integration.
+"""
+
+import logging
+from datetime import timedelta
+from typing import Optional
+
+from celery import shared_task
+from django.conf import settings
+from django.utils import timezone
+
+from apps.amazon_integration.log_buffer import flush_buffered_request_logs
+from apps.amazon_integration.models import AmazonCredentials, APIRequestLog
+from apps.amazon_integration.services.auth_service import AmazonAuthService
+from utils.exceptions import AmazonAPIException
+
+logger = logging.getLogger(__name__)
+
+# Request logs are only purged when a retention period is configured
+API_REQUEST_LOG_RETENTION_DAYS = getattr(settings, 'API_REQUEST_LOG_RETENTION_DAYS', None)
+PURGE_BATCH_SIZE = 10_000
+
+# Tokens that expired longer ago belong to sellers whose refresh keeps failing
+# or who stopped using the app; they are refreshed on demand instead.
+# Longer than the 6-hour beat interval so tokens that expired since the last run
+# are still refreshed.
+TOKEN_REFRESH_LOOKBACK_HOURS = 24
+
+
+@shared_task
+def flush_api_request_logs():
+    """Write buffered SP-API request logs to APIRequestLog in batches."""
+    written = flush_buffered_request_logs()
+    if written:
+        logger.info(f"Flushed {written} buffered API request log(s)")
+    return {'written': written}
+
+
+@shared_task
+def fetch_seller_info(credentials_id: int):
+    """Store the seller ID and marketplaces of newly connected credentials."""
+    try:
+        credentials = AmazonCredentials.objects.select_related(
+            'seller_profile__user'
+        ).get(pk=credentials_id)
+    except AmazonCredentials.DoesNotExist:
+        logger.error(f"Amazon credentials {credentials_id} not found")
+        return {'error': 'Credentials not found'}
+    
+    try:
+        updated = AmazonAuthService(credentials.seller_profile).update_seller_info()
+    except AmazonAPIException as e:
+        logger.warning(
+            f"Seller info fetch failed for seller {credentials.seller_profile.user.email}: {e}"
+        )
+        return {'updated': False}
+    
+    return {'updated': updated}
+
+
+@shared_task
+def refresh_expiring_tokens(
+    within_minutes: int = 10,
+    lookback_hours: int = TOKEN_REFRESH_LOOKBACK_HOURS
+):
+    """
+    Refresh the access tokens that expire within `within_minutes`, skipping
+    those that already expired more than `lookback_hours` ago.
+    """
+    now = timezone.now()
+    # Matches the amzn_cred_expiry_idx partial index
+    expiring = AmazonCredentials.objects.filter(
+        _access_token_encrypted__isnull=False,
+        access_token_expires_at__gte=now - timedelta(hours=lookback_hours),
+        access_token_expires_at__lt=now + timedelta(minutes=within_minutes),
+    ).select_related('seller_profile__user')
+    
+    refreshed = failed = 0
+    for credentials in expiring.iterator(chunk_size=100):
+        try:
+            AmazonAuthService(credentials.seller_profile).refresh_access_token()
+            refreshed += 1
+        except AmazonAPIException as e:
+            failed += 1
+            logger.warning(
+                f"Token refresh failed for seller {credentials.seller_profile.user.email}: {e}"
+            )
+    
+    logger.info(f"Refreshed {refreshed} expiring token(s), {failed} failure(s)")
+    return {'refreshed': refreshed, 'failed': failed}
+
+
+@shared_task
+def purge_old_api_request_logs(retention_days: Optional[int] = API_REQUEST_LOG_RETENTION_DAYS):
+    """Delete API request logs older than `retention_days`, in batches."""
+    if not retention_days:
+        logger.info("No API request log retention configured; nothing purged")
+        return {'deleted': 0}
+    
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    old_logs = APIRequestLog.objects.filter(request_at__lt=cutoff)
+    
+    deleted = 0
+    while True:
+        batch = list(old_logs.values_list('pk', flat=True)[:PURGE_BATCH_SIZE])
+        if not batch:
+            break
+        deleted += APIRequestLog.objects.filter(pk__in=batch).delete()[0]
+    
+    logger.info(f"Purged {deleted} API request log(s) older than {retention_days} days")
+    return {'deleted': deleted}
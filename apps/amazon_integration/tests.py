@@ -0,0 +1,413 @@
+import gzip
+import os
+import tempfile
+from unittest import mock, skipUnless
+
+import pandas as pd
+import requests
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.backends.redis import RedisCacheClient
+from django.utils import timezone
+from apps.accounts.models import SellerProfile
+from apps.amazon_integration.models import AmazonCredentials, APIRequestLog, ReportRequest, get_legacy_fernet
+from apps.amazon_integration.services.auth_service import LWA_TOKEN_URL, AmazonAuthService
+from apps.amazon_integration.services.http import session, token_refresh_session
+from apps.amazon_integration.services import reports_service, sp_api_client
+from apps.amazon_integration.services.reports_service import ReportsService
+from apps.amazon_integration.services.sp_api_client import MIN_RETRY_DELAY, SPAPIClient, with_retry
+from apps.amazon_integration.tasks import (
+    flush_api_request_logs, purge_old_api_request_logs, refresh_expiring_tokens,
+)
+from utils.exceptions import AmazonReportNotReadyError, AmazonThrottlingError, AmazonTokenExpiredError
+from utils.testing import REDIS_CACHES, FakeRedisList
+
+User = get_user_model()
+
+
+class AmazonCredentialsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='seller@example.com',
+            password='testpassword123'
+        )
+        self.seller_profile = SellerProfile.objects.get_or_create(user=self.user)[0]
+        self.credentials = AmazonCredentials(seller_profile=self.seller_profile)
+        self.credentials.refresh_token = 'refresh-1'
+        self.credentials.access_token = 'access-1'
+        self.credentials.save()
+
+    def test_update_tokens_without_refresh_token(self):
+        """Test a refresh without a new refresh token keeps the stored one."""
+        self.credentials.update_tokens('access-2', expires_in=3600)
+
+        credentials = AmazonCredentials.objects.get(pk=self.credentials.pk)
+        self.assertEqual(credentials.access_token, 'access-2')
+        self.assertEqual(credentials.refresh_token, 'refresh-1')
+        self.assertTrue(credentials.is_access_token_valid)
+
+    def test_update_tokens_with_refresh_token(self):
+        """Test a rotated refresh token is persisted alongside the access token."""
+        self.credentials.update_tokens('access-2', expires_in=3600, refresh_token='refresh-2')
+
+        credentials = AmazonCredentials.objects.get(pk=self.credentials.pk)
+        self.assertEqual(credentials.refresh_token, 'refresh-2')
+
+    def test_decrypted_token_follows_reload(self):
+        """Test the memoized token is dropped when the row is reloaded."""
+        self.assertEqual(self.credentials.access_token, 'access-1')
+        AmazonCredentials.objects.get(pk=self.credentials.pk).update_tokens('access-2', expires_in=3600)
+
+        self.credentials.refresh_from_db()
+        self.assertEqual(self.credentials.access_token, 'access-2')
+
+    def test_refresh_expiring_tokens_skips_long_expired_tokens(self):
+        """Test only tokens about to expire or recently expired are refreshed."""
+        now = timezone.now()
+        self.credentials.access_token_expires_at = now + timezone.timedelta(minutes=5)
+        self.credentials.save()
+        for i, expires_at in enumerate([now - timezone.timedelta(hours=2), now - timezone.timedelta(days=30)]):
+            user = User.objects.create_user(email=f'seller{i}@example.com', password='testpassword123')
+            credentials = AmazonCredentials(seller_profile=SellerProfile.objects.get_or_create(user=user)[0])
+            credentials.access_token = 'access-1'
+            credentials.access_token_expires_at = expires_at
+            credentials.save()
+
+        with mock.patch.object(AmazonAuthService, 'refresh_access_token') as refresh:
+            self.assertEqual(refresh_expiring_tokens(), {'refreshed': 2, 'failed': 0})
+        self.assertEqual(refresh.call_count, 2)
+
+    def test_expired_token_reuses_token_refreshed_by_another_worker(self):
+        """Test an expired token is taken from the cache instead of calling LWA again."""
+        cache.clear()
+        self.credentials.access_token_expires_at = timezone.now() - timezone.timedelta(minutes=1)
+        self.credentials.save()
+
+        # Another worker refreshes the token with its own copy of the credentials
+        other = AmazonAuthService(self.seller_profile)
+        other.credentials = AmazonCredentials.objects.get(pk=self.credentials.pk)
+        other._cache_access_token(other.credentials, 'access-2', expires_in=3600)
+
+        service = AmazonAuthService(self.seller_profile)
+        service.credentials = self.credentials
+        with mock.patch.object(token_refresh_session, 'post') as post:
+            self.assertEqual(service.get_valid_access_token(), 'access-2')
+        post.assert_not_called()
+
+    def test_deleting_credentials_forgets_cached_connection(self):
+        """Test the shared access token and connection check go with the credentials."""
+        profile_id = self.seller_profile.pk
+        cache.set(AmazonAuthService._access_token_cache_key(profile_id), 'encrypted')
+        cache.set(AmazonAuthService._connection_verified_cache_key(profile_id), True)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            AmazonCredentials.objects.filter(seller_profile=self.seller_profile).delete()
+
+        self.assertIsNone(cache.get(AmazonAuthService._access_token_cache_key(profile_id)))
+        self.assertIsNone(cache.get(AmazonAuthService._connection_verified_cache_key(profile_id)))
+
+    def test_only_token_refresh_is_resent_on_failure(self):
+        """Test refreshing a token is retried, exchanging a single-use code is not."""
+        refresh_retry = token_refresh_session.get_adapter(LWA_TOKEN_URL).max_retries
+        exchange_retry = session.get_adapter(LWA_TOKEN_URL).max_retries
+
+        self.assertTrue(refresh_retry.is_retry('POST', 503))
+        self.assertFalse(exchange_retry.is_retry('POST', 503))
+
+    def test_legacy_fernet_token_still_decrypts(self):
+        """Test tokens stored with the previous Fernet scheme remain readable."""
+        self.credentials._refresh_token_encrypted = get_legacy_fernet().encrypt(b'refresh-legacy')
+        self.assertEqual(self.credentials.refresh_token, 'refresh-legacy')
+
+    def test_oauth_state_is_single_use_and_bound_to_seller(self):
+        """Test an OAuth state is accepted once, and only for the seller it was issued to."""
+        _, state = AmazonAuthService(self.seller_profile).get_authorization_url('https://example.com/cb')
+
+        other_user = User.objects.create_user(email='other@example.com', password='testpassword123')
+        other_profile = SellerProfile.objects.get_or_create(user=other_user)[0]
+        _, other_state = AmazonAuthService(other_profile).get_authorization_url('https://example.com/cb')
+
+        service = AmazonAuthService(self.seller_profile)
+        self.assertEqual(service.consume_state(state), 'https://example.com/cb')
+        self.assertIsNone(service.consume_state(state))
+        self.assertIsNone(service.consume_state(other_state))
+
+    def test_oauth_state_falls_back_to_session(self):
+        """Test a callback served by a process without the cached state is checked against the session."""
+        service = AmazonAuthService(self.seller_profile)
+        user_session = {}
+        _, state = service.get_authorization_url('https://example.com/cb', user_session=user_session)
+        cache.clear()
+
+        self.assertEqual(service.consume_state(state, user_session=user_session), 'https://example.com/cb')
+        self.assertIsNone(service.consume_state(state, user_session=user_session))
+
+    def test_oauth_state_accepted_once_when_replayed_concurrently(self):
+        """Test only the request that deletes the cached state may use it."""
+        service = AmazonAuthService(self.seller_profile)
+        _, state = service.get_authorization_url('https://example.com/cb')
+
+        with mock.patch.object(cache, 'delete', return_value=False):
+            self.assertIsNone(service.consume_state(state))
+
+    def test_verified_connection_is_remembered_until_forgotten(self):
+        """Test a successful connection check is reused until an auth failure clears it."""
+        cache.clear()
+        self.credentials.access_token_expires_at = timezone.now() + timezone.timedelta(hours=1)
+        self.credentials.save()
+        service = AmazonAuthService(self.seller_profile)
+
+        with mock.patch.object(service, '_fetch_seller_info', return_value={'seller_id': 'S1'}) as fetch:
+            self.assertTrue(service.verify_connection())
+            self.assertTrue(service.verify_connection())
+            self.assertEqual(fetch.call_count, 1)
+
+            AmazonAuthService.forget_verified_connection(self.seller_profile)
+            self.assertTrue(service.verify_connection())
+            self.assertEqual(fetch.call_count, 2)
+
+    def test_connection_check_revalidates_seller_info(self):
+        """Test an expired connection check asks Amazon again, with the stored ETag."""
+        cache.clear()
+        self.credentials.access_token_expires_at = timezone.now() + timezone.timedelta(hours=1)
+        self.credentials.save()
+        service = AmazonAuthService(self.seller_profile)
+        participations = mock.Mock(status_code=200, headers={'ETag': '"v1"'})
+        participations.json.return_value = {'payload': [{'marketplace': {'id': 'A13V1IB3VIYBER'}}]}
+
+        with mock.patch.object(session, 'get', return_value=participations):
+            self.assertTrue(service.verify_connection())
+
+        cache.delete(AmazonAuthService._connection_verified_cache_key(self.seller_profile.pk))
+        with mock.patch.object(session, 'get', return_value=mock.Mock(status_code=304)) as get:
+            self.assertTrue(service.verify_connection())
+        self.assertEqual(get.call_args.kwargs['headers']['If-None-Match'], '"v1"')
+
+    def test_failed_token_refresh_forgets_verified_connection(self):
+        """Test a refresh rejected by Amazon clears the connection check and seller info."""
+        profile_id = self.seller_profile.pk
+        cache.set(AmazonAuthService._connection_verified_cache_key(profile_id), True)
+        cache.set(AmazonAuthService._seller_info_cache_key(profile_id), {'info': {}, 'etag': None})
+        response = mock.Mock(status_code=400)
+        response.json.return_value = {'error': 'invalid_grant'}
+        response.raise_for_status.side_effect = requests.exceptions.HTTPError(response=response)
+
+        with mock.patch.object(token_refresh_session, 'post', return_value=response):
+            with self.assertRaises(AmazonTokenExpiredError):
+                AmazonAuthService(self.seller_profile).refresh_access_token()
+
+        self.assertIsNone(cache.get(AmazonAuthService._connection_verified_cache_key(profile_id)))
+        self.assertIsNone(cache.get(AmazonAuthService._seller_info_cache_key(profile_id)))
+
+
+@override_settings(AMAZON_SIMULATION_MODE=False, AMAZON_SP_API_SETTINGS={'lwa_app_id': 'app'})
+class SPAPIClientLoggingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='seller@example.com',
+            password='testpassword123'
+        )
+        self.seller_profile = SellerProfile.objects.get_or_create(user=self.user)[0]
+        credentials = AmazonCredentials(seller_profile=self.seller_profile)
+        credentials.access_token = 'access-1'
+        credentials.access_token_expires_at = timezone.now() + timezone.timedelta(hours=1)
+        credentials.save()
+        self.client = SPAPIClient(self.seller_profile)
+
+    def test_request_logged_in_a_single_write(self):
+        """Test a finished request is written once, with its final status."""
+        response = mock.Mock(status_code=200, ok=True, text='{}', content=b'{}', headers={})
+        response.json.return_value = {}
+
+        with mock.patch.object(session, 'get', return_value=response):
+            with self.assertNumQueries(1):
+                self.client.get('/orders/v0/orders')
+
+        log = APIRequestLog.objects.get()
+        self.assertEqual(log.status, APIRequestLog.RequestStatus.SUCCESS)
+        self.assertIsNotNone(log.duration_ms)
+
+    @override_settings(CACHES=REDIS_CACHES)
+    def test_request_log_buffered_in_redis_and_flushed(self):
+        """Test request logs are buffered in Redis and written by the flush task."""
+        log_entry = APIRequestLog(
+            seller_profile=self.seller_profile,
+            endpoint='/orders/v0/orders',
+            method='GET',
+            request_params={'MarketplaceIds': 'A13V1IB3VIYBER'},
+        )
+        redis_client = FakeRedisList()
+
+        with mock.patch.object(RedisCacheClient, 'get_client', return_value=redis_client):
+            # Finishing the request queues the entry without touching the database
+            with self.assertNumQueries(0):
+                log_entry.mark_success(200, '{}')
+
+            self.assertEqual(flush_api_request_logs(), {'written': 1})
+
+        log = APIRequestLog.objects.get()
+        self.assertEqual(log.status, APIRequestLog.RequestStatus.SUCCESS)
+        self.assertEqual(log.request_params, {'MarketplaceIds': 'A13V1IB3VIYBER'})
+
+    @override_settings(CACHES=REDIS_CACHES)
+    def test_buffered_request_logs_kept_when_flush_fails(self):
+        """Test a batch that fails to insert stays buffered for the next flush."""
+        redis_client = FakeRedisList()
+
+        with mock.patch.object(RedisCacheClient, 'get_client', return_value=redis_client):
+            APIRequestLog(seller_profile=self.seller_profile, endpoint='/a', method='GET').mark_success(200)
+            APIRequestLog(seller_profile=self.seller_profile, endpoint='/b', method='GET').mark_success(200)
+
+            with mock.patch.object(APIRequestLog.objects, 'bulk_create', side_effect=DatabaseError):
+                with self.assertRaises(DatabaseError):
+                    flush_api_request_logs()
+
+            self.assertEqual(flush_api_request_logs(), {'written': 2})
+
+        self.assertEqual(
+            list(APIRequestLog.objects.order_by('request_at').values_list('endpoint', flat=True)),
+            ['/a', '/b']
+        )
+
+    def test_response_parsed_with_and_without_orjson(self):
+        """Test responses parse the same with orjson and with the json fallback."""
+        response = mock.Mock(status_code=200, ok=True, content='{"payload": {"é": 1}}'.encode(), headers={})
+
+        for json_module in (sp_api_client.orjson, None):
+            with self.subTest(orjson=bool(json_module)):
+                with mock.patch.object(sp_api_client, 'orjson', json_module), \
+                        mock.patch.object(session, 'get', return_value=response):
+                    self.assertEqual(self.client.get('/orders/v0/orders'), {'payload': {'é': 1}})
+
+
+
+    def test_request_logs_purged_only_with_a_retention_period(self):
+        """Test old request logs are kept unless a retention period is set."""
+        APIRequestLog.objects.create(
+            seller_profile=self.seller_profile,
+            endpoint='/orders/v0/orders',
+            method='GET',
+            request_at=timezone.now() - timezone.timedelta(days=120),
+        )
+
+        self.assertEqual(purge_old_api_request_logs(), {'deleted': 0})
+        self.assertEqual(purge_old_api_request_logs(retention_days=90), {'deleted': 1})
+
+class RetryBackoffTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = mock.Mock(seller_profile=mock.Mock(pk=1))
+
+        @with_retry(max_retries=1, base_delay=2.0)
+        def throttled(client):
+            raise AmazonThrottlingError()
+
+        self.throttled = throttled
+
+    def test_first_retry_is_jittered(self):
+        """Test the first retry waits a random time up to the base delay."""
+        with mock.patch.object(sp_api_client.random, 'uniform', return_value=0.7) as uniform, \
+                mock.patch.object(sp_api_client.time, 'sleep') as sleep:
+            with self.assertRaises(AmazonThrottlingError):
+                self.throttled(self.client)
+
+        uniform.assert_called_once_with(MIN_RETRY_DELAY, 2.0)
+        sleep.assert_called_once_with(0.7)
+
+    def test_retry_waits_for_the_seller_backoff(self):
+        """Test a worker waits as long as the seller's latest throttle deadline."""
+        sp_api_client._shared_throttle_wait(1, 30)
+
+        with mock.patch.object(sp_api_client.time, 'sleep') as sleep:
+            with self.assertRaises(AmazonThrottlingError):
+                self.throttled(self.client)
+
+        self.assertGreater(sleep.call_args[0][0], 25)
+
+class ReportParsingTests(TestCase):
+    REPORT = b'sku\tQuantity\tship-country\tdetail\n00123\t1\tNA\tx\nN/A\t2\tFR\t\n00123\t3\tFR\tnull\n'
+
+    def parse(self, content, compression=None):
+        return ReportsService._parse_report_content(None, content, compression=compression)
+
+    def assert_parsed(self, df):
+        self.assertEqual(list(df.columns), ['sku', 'quantity', 'ship_country', 'detail'])
+        self.assertIsInstance(df['sku'].dtype, pd.CategoricalDtype)
+        # Identifiers are never inferred as numbers; only the listed values are missing
+        self.assertEqual(df['sku'].iloc[0], '00123')
+        self.assertTrue(pd.isna(df['sku'].iloc[1]))
+        self.assertEqual(df['ship_country'].iloc[0], 'NA')
+        self.assertEqual(df['quantity'].tolist(), ['1', '2', '3'])
+        # Both readers give the same dtypes and missing values
+        self.assertEqual(df['detail'].dtype, reports_service.REPORT_STRING_DTYPE)
+        self.assertIs(df['detail'].iloc[1], pd.NA)
+        self.assertIs(df['detail'].iloc[2], pd.NA)
+
+    @skipUnless(reports_service.pa_csv, 'pyarrow is not installed')
+    def test_parse_with_pyarrow(self):
+        """Test the PyArrow reader keeps identifiers as categorical strings."""
+        self.assert_parsed(self.parse(self.REPORT))
+
+    def test_parse_without_pyarrow(self):
+        """Test the pandas reader used without PyArrow gives the same frame."""
+        with mock.patch.object(reports_service, 'pa_csv', None):
+            self.assert_parsed(self.parse(self.REPORT))
+
+    def test_parse_rows_shorter_than_header(self):
+        """Test a report whose rows miss trailing fields is still parsed."""
+        df = self.parse(self.REPORT.replace(b'\tdetail\n', b'\tdetail\tshipment-id\n', 1))
+
+        self.assert_parsed(df.drop(columns='shipment_id'))
+        self.assertTrue(df['shipment_id'].isna().all())
+
+    def test_parse_simulated_report(self):
+        """Test the report served in simulation mode has a row for each line."""
+        content = SPAPIClient._generate_mock_report_content(None)
+
+        self.assertEqual(len(self.parse(content)), 20)
+
+    def test_parse_gzipped_report_file(self):
+        """Test a report saved compressed is decompressed by both readers."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'report.tsv.gz')
+            with open(path, 'wb') as f:
+                f.write(gzip.compress(self.REPORT))
+
+            self.assert_parsed(self.parse(path, compression='gzip'))
+            with mock.patch.object(reports_service, 'pa_csv', None):
+                self.assert_parsed(self.parse(path, compression='gzip'))
+
+
+@override_settings(AMAZON_SIMULATION_MODE=True)
+class ReportDownloadTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='seller@example.com',
+            password='testpassword123'
+        )
+        self.seller_profile = SellerProfile.objects.get_or_create(user=self.user)[0]
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        with override_settings(MEDIA_ROOT=media_root.name):
+            self.service = ReportsService(self.seller_profile)
+
+    def test_download_all_ready_reports_waits_for_each_report(self):
+        """Test reports are waited for and downloaded together, skipping the ones that time out."""
+        ready = ReportRequest(report_type=ReportRequest.ReportType.FBA_INVENTORY, report_id='1')
+        late = ReportRequest(report_type=ReportRequest.ReportType.FBA_REIMBURSEMENTS, report_id='2')
+        df = pd.DataFrame({'sku': ['SKU-1']})
+
+        def wait_for_report(report_request, max_wait_seconds):
+            self.assertEqual(max_wait_seconds, 600)
+            if report_request is late:
+                raise AmazonReportNotReadyError(late.report_id, 'Report not ready after 600s')
+            return report_request
+
+        with mock.patch.object(self.service, 'wait_for_report', side_effect=wait_for_report), \
+                mock.patch.object(self.service, 'download_report', return_value=('report.tsv', df)) as download:
+            reports_data = self.service.download_all_ready_reports([ready, late], max_wait_seconds=600)
+
+        self.assertEqual(reports_data, {ready.report_type: df})
+        download.assert_called_once_with(ready)
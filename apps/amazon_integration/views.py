@@ -10,6 +10,7 @@ import secrets
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
 from django.http import JsonResponse
 from django.shortcuts import redirect, render
 from django.urls import reverse
@@ -18,6 +19,7 @@ from django.views.decorators.http import require_http_methods
 from apps.accounts.models import SellerProfile
 from apps.amazon_integration.models import AmazonCredentials
 from apps.amazon_integration.services.auth_service import AmazonAuthService
+from apps.amazon_integration.tasks import fetch_seller_info
 from utils.exceptions import AmazonAuthenticationError
 
 logger = logging.getLogger(__name__)
@@ -37,13 +39,9 @@ def initiate_amazon_auth(request):
     # Generate redirect URI
     redirect_uri = request.build_absolute_uri(reverse('amazon_integration:oauth_callback'))
     
-    # Get authorization URL
-    auth_service = AmazonAuthService()
-    auth_url, state = auth_service.get_authorization_url(redirect_uri)
-    
-    # Store state in session for CSRF protection
-    request.session['amazon_oauth_state'] = state
-    request.session['amazon_oauth_redirect_uri'] = redirect_uri
+    # Get authorization URL (the state is kept for CSRF protection)
+    auth_service = AmazonAuthService(seller_profile)
+    auth_url, _ = auth_service.get_authorization_url(redirect_uri, user_session=request.session)
     
     logger.info(f"Initiating Amazon OAuth for user: {user.email}")
     
@@ -80,41 +78,34 @@ def oauth_callback(request):
         )
         return redirect('dashboard:connect_amazon')
     
-    # Verify state (CSRF protection)
+    # Get or create seller profile
+    seller_profile, _ = SellerProfile.objects.get_or_create(user=user)
+    
+    # Verify state (CSRF protection); it was issued with the redirect URI
     state = request.GET.get('state')
-    expected_state = request.session.get('amazon_oauth_state')
+    auth_service = AmazonAuthService(seller_profile)
+    redirect_uri = auth_service.consume_state(state, user_session=request.session)
     
-    if state != expected_state:
-        logger.warning(f"State mismatch for user {user.email}: {state} != {expected_state}")
+    if redirect_uri is None:
+        logger.warning(f"Unknown or expired OAuth state for user {user.email}")
         messages.error(
             request,
             "Erreur de sécurité. Veuillez réessayer."
         )
         return redirect('dashboard:connect_amazon')
     
-    # Get redirect URI from session
-    redirect_uri = request.session.get('amazon_oauth_redirect_uri')
-    
-    # Clean up session
-    request.session.pop('amazon_oauth_state', None)
-    request.session.pop('amazon_oauth_redirect_uri', None)
-    
     try:
-        # Get or create seller profile
-        seller_profile, _ = SellerProfile.objects.get_or_create(user=user)
-        
         # Exchange code for tokens
-        auth_service = AmazonAuthService()
         credentials = auth_service.exchange_authorization_code(
             authorization_code=spapi_oauth_code,
             redirect_uri=redirect_uri,
             seller_profile=seller_profile,
         )
         
-        logger.info(
-            f"Successfully connected Amazon account for user {user.email} "
-            f"(Seller ID: {credentials.seller_id})"
-        )
+        # Seller ID and marketplaces are fetched from SP-API in the background
+        transaction.on_commit(lambda: _queue_seller_info_fetch(credentials.pk))
+        
+        logger.info(f"Successfully connected Amazon account for user {user.email}")
         
         messages.success(
             request,
@@ -141,6 +132,15 @@ def oauth_callback(request):
         return redirect('dashboard:connect_amazon')
 
 
+def _queue_seller_info_fetch(credentials_id):
+    """Queue the seller info fetch, running it inline when the broker is down."""
+    try:
+        fetch_seller_info.delay(credentials_id)
+    except Exception as e:
+        logger.warning(f"Broker connection failed ({e}). Fetching seller info synchronously.")
+        fetch_seller_info(credentials_id)
+
+
 @login_required
 def check_connection_status(request):
     """
@@ -150,7 +150,10 @@ def check_connection_status(request):
     user = request.user
     
     try:
-        seller_profile = user.seller_profile
+        # Credentials are loaded with the profile for the verification below
+        seller_profile = SellerProfile.objects.select_related(
+            'amazon_credentials'
+        ).get(user=user)
         
         if not seller_profile.is_amazon_connected:
             return JsonResponse({
@@ -199,11 +202,12 @@ def disconnect_amazon(request):
     try:
         seller_profile = user.seller_profile
         
-        # Delete credentials
-        AmazonCredentials.objects.filter(seller_profile=seller_profile).delete()
-        
-        # Clear profile
-        seller_profile.disconnect_amazon()
+        with transaction.atomic():
+            # Delete credentials
+            AmazonCredentials.objects.filter(seller_profile=seller_profile).delete()
+            
+            # Clear profile (no-op when already disconnected)
+            seller_profile.disconnect_amazon()
         
         logger.info(f"User {user.email} disconnected their Amazon account")
         
@@ -230,7 +234,9 @@ def amazon_settings(request):
     Amazon connection settings page.
     """
     user = request.user
-    seller_profile, _ = SellerProfile.objects.get_or_create(user=user)
+    seller_profile, _ = SellerProfile.objects.select_related(
+        'amazon_credentials'
+    ).get_or_create(user=user)
     
     credentials = None
     if seller_profile.is_amazon_connected:
@@ -272,7 +272,7 @@ class DataProcessor:
             # Calculate value from reimbursements where we have both quantity and amount
             if 'sku' in reimbursements_df.columns and 'amount' in reimbursements_df.columns:
                 # Group by SKU and calculate average unit value
-                grouped = reimbursements_df.groupby('sku').agg({
+                grouped = reimbursements_df.groupby('sku', observed=True).agg({
                     'amount': 'sum',
                     'quantity': 'sum'
                 }).reset_index()
@@ -316,13 +316,14 @@ class DataProcessor:
             if 'total_value' in df.columns:
                 agg_cols['total_value'] = 'sum'
         
-        # Only include columns that exist
+        # Only include columns that exist. Report identifiers are categoricals:
+        # observed=True leaves out categories whose rows were filtered away.
         valid_agg = {k: v for k, v in agg_cols.items() if k in df.columns}
         
         if not valid_agg:
-            return df.groupby(group_cols).size().reset_index(name='count')
+            return df.groupby(group_cols, observed=True).size().reset_index(name='count')
         
-        return df.groupby(group_cols).agg(valid_agg).reset_index()
+        return df.groupby(group_cols, observed=True).agg(valid_agg).reset_index()
     
     def merge_reports(
         self,
@@ -347,7 +348,7 @@ class DataProcessor:
         # Create a reimbursement lookup by SKU and date range
         if len(reimbursements_df) > 0:
             # Aggregate reimbursements by SKU
-            reimb_agg = reimbursements_df.groupby('sku').agg({
+            reimb_agg = reimbursements_df.groupby('sku', observed=True).agg({
                 'amount': 'sum',
                 'quantity': 'sum'
             }).reset_index()
@@ -62,38 +62,24 @@ def run_full_audit(self, audit_id: int):
         
         audit.update_progress(20, f'Waiting for {len(report_requests)} reports...')
         
-        # Wait for reports and download them
-        reports_data = {}
-        
-        for i, report_request in enumerate(report_requests):
-            progress = 20 + int((i / len(report_requests)) * 30)
-            audit.update_progress(progress, f'Downloading report {i+1}/{len(report_requests)}...')
-            
-            try:
-                # Wait for report to be ready
-                reports_service.wait_for_report(report_request, max_wait_seconds=600)
-                
-                # Download
-                file_path, df = reports_service.download_report(report_request)
-                reports_data[report_request.report_type] = df
-                
-                # Save audit report record
-                AuditReport.objects.create(
-                    audit=audit,
-                    report_request=report_request,
-                    report_type=report_request.report_type,
-                    file_path=file_path,
-                    row_count=len(df),
-                )
-                
-            except Exception as e:
-                with open('error_log.txt', 'a') as f:
-                    import traceback
-                    f.write(f"CRITICAL: Failed to get report {report_request.report_type}: {type(e)} {str(e)}\n")
-                    traceback.print_exc(file=f)
-                logger.error(f"Failed to get report {report_request.report_type}: {str(e)}")
-                # Continue with other reports
-                continue
+        # Wait for the reports and download them concurrently; reports that
+        # fail or are not ready in time are logged and skipped
+        reports_data = reports_service.download_all_ready_reports(
+            report_requests, max_wait_seconds=600
+        )
+        
+        # Save audit report records
+        AuditReport.objects.bulk_create([
+            AuditReport(
+                audit=audit,
+                report_request=report_request,
+                report_type=report_request.report_type,
+                file_path=report_request.file_path,
+                row_count=len(reports_data[report_request.report_type]),
+            )
+            for report_request in report_requests
+            if report_request.report_type in reports_data
+        ])
         
         if not reports_data:
             raise Exception("No reports could be downloaded from Amazon")
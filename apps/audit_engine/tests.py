@@ -1,8 +1,10 @@
+import pandas as pd
 from django.test import TestCase, Client
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from apps.accounts.models import SellerProfile
 from apps.audit_engine.models import Audit, AuditStatus
+from apps.audit_engine.services.data_processor import DataProcessor
 
 User = get_user_model()
 
@@ -54,3 +56,15 @@ class AuditEngineTests(TestCase):
         # Should redirect to results
         self.assertRedirects(response, reverse('audit_engine:audit_results'))
 
+
+class DataProcessorTests(TestCase):
+    def test_aggregate_by_sku_skips_filtered_categories(self):
+        """Test SKUs filtered out of a categorical column do not come back as empty groups."""
+        df = pd.DataFrame({
+            'sku': pd.Categorical(['SKU-1', 'SKU-2', 'SKU-3']),
+            'quantity': [1, 0, 2],
+        })
+
+        aggregated = DataProcessor().aggregate_by_sku(df[df['quantity'] != 0])
+
+        self.assertEqual(sorted(aggregated['sku']), ['SKU-1', 'SKU-3'])
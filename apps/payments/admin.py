@@ -4,6 +4,9 @@ Payments Admin
 """
 
 from django.contrib import admin, messages
+from django.db import transaction
+
+from apps.accounts.models import CreditTransaction
 from .models import PaymentTransaction, CreditPackage
 
 
@@ -18,24 +21,32 @@ class PaymentTransactionAdmin(admin.ModelAdmin):
     @admin.action(description='Valider le paiement (Virement Reçu)')
     def mark_as_paid(self, request, queryset):
         """Mark selected transactions as paid and deliver credits."""
-        updated_count = 0
+        pending = []
         already_paid_count = 0
         
-        for transaction in queryset:
-            if transaction.status == PaymentTransaction.TransactionStatus.COMPLETED:
+        for payment in queryset.select_related('seller_profile'):
+            if payment.status == PaymentTransaction.TransactionStatus.COMPLETED:
                 already_paid_count += 1
                 continue
-            
-            # Add credits to seller
-            transaction.seller_profile.add_credits(
-                transaction.credits_purchased,
-                f"Virement reçu: {transaction.reference_code}"
-            )
+            pending.append(payment)
+        
+        with transaction.atomic():
+            # Add credits to sellers: one ledger INSERT and one balance UPDATE
+            CreditTransaction.bulk_apply([
+                CreditTransaction(
+                    seller_profile=payment.seller_profile,
+                    amount=payment.credits_purchased,
+                    transaction_type=CreditTransaction.TransactionType.CREDIT,
+                    description=f"Virement reçu: {payment.reference_code}",
+                )
+                for payment in pending
+            ])
             
             # Mark as completed
-            transaction.mark_completed()
-            updated_count += 1
+            for payment in pending:
+                payment.mark_completed()
         
+        updated_count = len(pending)
         if updated_count > 0:
             self.message_user(request, f"{updated_count} transactions validées et crédits livrés.", messages.SUCCESS)
         
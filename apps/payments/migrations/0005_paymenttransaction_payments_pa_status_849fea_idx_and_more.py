@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-15 23:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0004_alter_paymenttransaction_payment_method'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='paymenttransaction',
+            index=models.Index(fields=['status', 'completed_at'], name='payments_pa_status_849fea_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paymenttransaction',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['-created_at'], name='pay_pending_idx'),
+        ),
+    ]
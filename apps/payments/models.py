@@ -94,6 +94,15 @@ class PaymentTransaction(models.Model):
         verbose_name = _('transaction de paiement')
         verbose_name_plural = _('transactions de paiement')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'completed_at']),
+            # Bank transfers awaiting validation are a small, hot subset
+            models.Index(
+                fields=['-created_at'],
+                condition=models.Q(status='pending'),
+                name='pay_pending_idx',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.get_transaction_type_display()} - €{self.amount} - {self.seller_profile.user.email}"
@@ -1,8 +1,11 @@
-from django.test import TestCase, Client
+from django.test import TestCase, Client, RequestFactory
 from django.urls import reverse
+from django.contrib import admin
 from django.contrib.auth import get_user_model
+from django.contrib.messages.storage.fallback import FallbackStorage
 from apps.accounts.models import SellerProfile
-from apps.payments.models import CreditPackage
+from apps.payments.admin import PaymentTransactionAdmin
+from apps.payments.models import CreditPackage, PaymentTransaction
 
 User = get_user_model()
 
@@ -40,3 +43,38 @@ class PaymentsTests(TestCase):
         # In test/dev environment without Stripe keys, this might behave differently
         # Usually redirects to Stripe Checkout or returns 200/302
         self.assertTrue(response.status_code in [200, 302])
+
+
+class PaymentTransactionAdminTests(TestCase):
+    def test_mark_as_paid_delivers_credits(self):
+        """Test the admin action credits each pending transfer once, in bulk."""
+        user = User.objects.create_user(email='payer@example.com', password='testpassword123')
+        seller_profile = user.seller_profile
+        payments = [
+            PaymentTransaction.objects.create(
+                seller_profile=seller_profile,
+                transaction_type=PaymentTransaction.TransactionType.CREDIT_PURCHASE,
+                status=status,
+                amount=29.99,
+                credits_purchased=10,
+            )
+            for status in (
+                PaymentTransaction.TransactionStatus.PENDING,
+                PaymentTransaction.TransactionStatus.PENDING,
+                PaymentTransaction.TransactionStatus.COMPLETED,
+            )
+        ]
+        request = RequestFactory().post('/')
+        request.session = {}
+        request._messages = FallbackStorage(request)
+        
+        PaymentTransactionAdmin(PaymentTransaction, admin.site).mark_as_paid(
+            request, PaymentTransaction.objects.filter(pk__in=[p.pk for p in payments])
+        )
+        
+        seller_profile.refresh_from_db()
+        self.assertEqual(seller_profile.credits_balance, 20)
+        self.assertEqual(seller_profile.credit_transactions.count(), 2)
+        self.assertFalse(
+            PaymentTransaction.objects.exclude(status=PaymentTransaction.TransactionStatus.COMPLETED).exists()
+        )
@@ -8,6 +8,7 @@ Used for long-running audit tasks that can take 5-10 minutes.
 import os
 from celery import Celery
 from celery.schedules import crontab
+from django.conf import settings
 
 # Set the default Django settings module
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.production')
@@ -46,8 +47,38 @@ app.conf.beat_schedule = {
         'schedule': crontab(minute=0, hour='*/6'),
         'options': {'queue': 'maintenance'},
     },
+    
+    # Roll up yesterday's admin dashboard statistics daily at 00:15
+    'recompute-dashboard-stats': {
+        'task': 'admin_console.tasks.recompute_daily_stats',
+        'schedule': crontab(hour=0, minute=15),
+        'options': {'queue': 'maintenance'},
+    },
+    
+    # Write buffered login history rows every minute
+    'flush-login-history': {
+        'task': 'apps.accounts.tasks.flush_login_history',
+        'schedule': crontab(),
+        'options': {'queue': 'maintenance'},
+    },
+    
+    # Write buffered SP-API request logs every minute
+    'flush-api-request-logs': {
+        'task': 'apps.amazon_integration.tasks.flush_api_request_logs',
+        'schedule': crontab(),
+        'options': {'queue': 'maintenance'},
+    },
 }
 
+# Drop SP-API request logs past their retention daily at 3:30 AM, only when
+# API_REQUEST_LOG_RETENTION_DAYS is set
+if settings.API_REQUEST_LOG_RETENTION_DAYS:
+    app.conf.beat_schedule['purge-api-request-logs'] = {
+        'task': 'apps.amazon_integration.tasks.purge_old_api_request_logs',
+        'schedule': crontab(hour=3, minute=30),
+        'options': {'queue': 'maintenance'},
+    }
+
 # =============================================================================
 # TASK ROUTING
 # =============================================================================
@@ -59,11 +90,16 @@ app.conf.task_routes = {
     
     # Quick tasks
     'apps.audit_engine.tasks.generate_case_file': {'queue': 'default'},
+    'apps.amazon_integration.tasks.flush_api_request_logs': {'queue': 'maintenance'},
+    'apps.amazon_integration.tasks.purge_old_api_request_logs': {'queue': 'maintenance'},
     'apps.amazon_integration.tasks.*': {'queue': 'default'},
+    'apps.accounts.tasks.send_welcome_email': {'queue': 'default'},
     
     # Maintenance tasks
     'apps.audit_engine.tasks.check_stale_audits': {'queue': 'maintenance'},
     'apps.audit_engine.tasks.cleanup_temp_files': {'queue': 'maintenance'},
+    'admin_console.tasks.recompute_daily_stats': {'queue': 'maintenance'},
+    'apps.accounts.tasks.flush_login_history': {'queue': 'maintenance'},
 }
 
 # =============================================================================
@@ -80,6 +80,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'apps.accounts.middleware.SellerProfileMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'allauth.account.middleware.AccountMiddleware',
@@ -198,6 +199,10 @@ CELERY_TASK_TIME_LIMIT = 30 * 60  # 30 minutes max per task
 CELERY_RESULT_EXTENDED = True
 # CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'  # Requires django-celery-beat
 
+# SP-API request logs are kept indefinitely unless a retention period (days)
+# is set; the daily purge is only scheduled when it is
+API_REQUEST_LOG_RETENTION_DAYS = env.int('API_REQUEST_LOG_RETENTION_DAYS', default=None)
+
 # Retry settings for rate limiting
 CELERY_TASK_ACKS_LATE = True
 CELERY_TASK_REJECT_ON_WORKER_LOST = True
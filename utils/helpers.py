@@ -8,12 +8,13 @@ import hashlib
 import secrets
 import string
 import re
-from datetime import datetime, timedelta, date
+from datetime import datetime, timedelta, date, time
 from typing import Optional, List, Dict, Any
 from decimal import Decimal, ROUND_HALF_UP
 
 import pytz
 from django.conf import settings
+from django.db import connection
 from django.utils import timezone
 
 
@@ -83,6 +84,49 @@ def calculate_date_range(months_back: int = 18) -> tuple:
     return start_date, end_date
 
 
+def start_of_day(day: date) -> datetime:
+    """
+    Return midnight of a day as an aware datetime in the current timezone.
+    Filtering timestamps against this (instead of `field__date=day`) keeps
+    the column uncast, so btree indexes on it stay usable.
+    
+    Args:
+        day: The calendar day
+        
+    Returns:
+        Aware datetime at 00:00 local time
+    """
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+# Below this many rows an exact COUNT(*) is cheap enough to keep
+APPROX_COUNT_THRESHOLD = 100_000
+
+
+def approx_count(model) -> int:
+    """
+    Row count of a model's table, estimated from the Postgres planner
+    statistics for large tables. Headline totals only: other backends,
+    small or never-analyzed tables fall back to an exact COUNT(*).
+    
+    Args:
+        model: The model whose table is counted
+        
+    Returns:
+        Estimated or exact number of rows
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        if row and row[0] >= APPROX_COUNT_THRESHOLD:
+            return row[0]
+    return model.objects.count()
+
+
 def is_within_45_day_window(event_date: date) -> bool:
     """
     Check if a date is within the 45-day waiting period.
@@ -0,0 +1,47 @@
+"""
+Testing Helpers
+===============
+Test doubles shared by the app test suites.
+"""
+
+REDIS_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://localhost:6379/0',
+    }
+}
+
+
+class FakeRedisList:
+    """In-memory stand-in for the Redis list commands used by the write buffers."""
+
+    def __init__(self):
+        self.lists = {}
+
+    def rpush(self, key, value):
+        self.lists.setdefault(key, []).append(value.encode('utf-8'))
+
+    def lpush(self, key, *values):
+        for value in values:
+            self.lists.setdefault(key, []).insert(0, value)
+
+    def pipeline(self):
+        return FakeRedisPipeline(self)
+
+
+class FakeRedisPipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def lrange(self, key, start, end):
+        self.commands.append(lambda: list(self.client.lists.get(key, [])[start:end + 1]))
+
+    def ltrim(self, key, start, end):
+        def trim():
+            self.client.lists[key] = self.client.lists.get(key, [])[start:]
+            return True
+        self.commands.append(trim)
+
+    def execute(self):
+        return [command() for command in self.commands]